@@ -0,0 +1,88 @@
+import sys
+import pygame
+from config import DEFS
+
+# Formatos já avisados pela checagem de debug: (origem do blit, formato)
+_warned = set()
+
+def has_alpha_channel(surface):
+    """True se surface tem alpha por pixel (não só a transparência da superfície)"""
+    return surface.get_masks()[3] != 0
+
+def premultiplied():
+    """True se as superfícies prontas para blit usam alpha pré-multiplicado"""
+    return DEFS.get('premultiplied_alpha', False)
+
+def to_display(surface, alpha=None):
+    """
+    Converte surface para o formato de pixel da tela
+
+    Args:
+        surface: Superfície original (imagem carregada, recorte da spritesheet...)
+        alpha: Mantém canal alpha (padrão: se surface tem alpha por pixel)
+    """
+    if alpha is None:
+        alpha = has_alpha_channel(surface)
+    surface_alpha = surface.get_alpha()
+    converted = surface.convert_alpha() if alpha else surface.convert()
+    if surface_alpha is not None and surface_alpha < 255:
+        converted.set_alpha(surface_alpha)
+    return converted
+
+def prepare(surface, alpha=None):
+    """
+    Superfície de longa duração pronta para blit no loop (cache de sprites,
+    rostos, overlay, mapa, capa do álbum)
+
+    Converte para o formato da tela e, com premultiplied_alpha ligado,
+    pré-multiplica o alpha (a transparência da superfície entra no canal
+    alpha). Deve ser desenhada com assets.blit.
+
+    Pixels opacos e totalmente transparentes saem idênticos ao blit normal;
+    os translúcidos podem diferir em 1 nível por canal a cada blit, por causa
+    do arredondamento (fundos translúcidos sobrepostos acumulam: no painel
+    MUSIC chega a 4 níveis).
+    """
+    converted = to_display(surface, alpha)
+    if not premultiplied() or not has_alpha_channel(converted):
+        return converted
+    if not converted.get_width() or not converted.get_height():
+        return converted  # premul_alpha derruba o processo com superfície vazia (texto "")
+    surface_alpha = converted.get_alpha()
+    if surface_alpha is not None and surface_alpha < 255:
+        converted.set_alpha(255)
+        converted.fill((255, 255, 255, surface_alpha), special_flags=pygame.BLEND_RGBA_MULT)
+    return converted.premul_alpha()
+
+def load_image(file, alpha=True):
+    """Carrega uma imagem já no formato da tela"""
+    return to_display(pygame.image.load(file), alpha)
+
+def blit_flags(surface):
+    """special_flags para desenhar uma superfície vinda de prepare"""
+    if premultiplied() and has_alpha_channel(surface):
+        return pygame.BLEND_PREMULTIPLIED
+    return 0
+
+def blit(dest, surface, position, area=None):
+    """Blit de uma superfície de prepare; com debug_formats, checa o formato"""
+    if DEFS.get('debug_formats', False):
+        check_format(dest, surface, sys._getframe(1))
+    return dest.blit(surface, position, area, blit_flags(surface))
+
+def check_format(dest, surface, frame=None):
+    """
+    Avisa (uma vez por local e formato) quando surface não está no formato
+    da tela e o blit vai converter pixel a pixel a cada quadro
+    """
+    reference = pygame.display.get_surface() or dest
+    source_format = (surface.get_bitsize(), surface.get_masks()[:3])
+    if source_format == (reference.get_bitsize(), reference.get_masks()[:3]):
+        return True
+    frame = frame or sys._getframe(1)
+    where = f"{frame.f_code.co_filename}:{frame.f_lineno}"
+    if (where, source_format) not in _warned:
+        _warned.add((where, source_format))
+        print(f"⚠️ Blit com formato diferente da tela em {where}: "
+              f"{surface.get_bitsize()} bits, máscaras {surface.get_masks()}")
+    return False
@@ -35,7 +35,9 @@ class MusicPlayer:
         self.queue = [
             fname for fname in os.listdir("assets/music/") if fname.lower().endswith(('.mp3', '.m4a', '.wav'))
         ]
-        self.load_track(self.queue[1])
+        if self.queue:
+            # Começa pela segunda faixa quando há mais de uma
+            self.load_track(self.queue[min(1, len(self.queue) - 1)])
     def skip_music(self,dir=1):
         current_index = self.queue.index(self.current_track)
         next_index = (current_index + dir) % len(self.queue)
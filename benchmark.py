@@ -0,0 +1,250 @@
+"""
+Benchmark headless do loop de renderização
+
+Sobe o app completo (config, Glock, UI, TeeVee) com o driver de vídeo SDL
+"dummy", com rede e psutil substituídos por valores fixos, e renderiza N
+quadros para cada combinação dos efeitos de [TOGGLE] e para cada painel de
+conteúdo. Os resultados são salvos em JSON para comparar commits.
+
+Uso:
+    python benchmark.py --frames 60 --output bench.json
+    python benchmark.py --panels MENU CONFIG --compare bench_anterior.json
+    python benchmark.py --internal --output bench_interna.json
+    python benchmark.py --workers 1 2 4 --panels MENU
+    python benchmark.py --pipeline --compare bench.json
+    python benchmark.py --startup --output startup.json
+"""
+import os
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import argparse
+import itertools
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from collections import namedtuple
+
+import numpy as np
+import pygame
+
+EFFECTS = ("crt", "overlay", "distortion", "scanlines")
+
+def stub_environment():
+    """Isola o benchmark da rede e da máquina: sem HTTP e psutil com valores fixos"""
+    import urllib.request
+    import requests
+    import psutil
+
+    def offline(*args, **kwargs):
+        raise OSError("Rede desativada no benchmark")
+
+    urllib.request.urlopen = offline
+    requests.get = offline
+
+    Freq = namedtuple("Freq", "current min max")
+    NetIO = namedtuple("NetIO", "bytes_sent bytes_recv")
+    Disk = namedtuple("Disk", "total used free percent")
+    Memory = namedtuple("Memory", "total used available percent")
+
+    psutil.cpu_percent = lambda interval=None: 25.0
+    psutil.cpu_freq = lambda: Freq(1500.0, 600.0, 2400.0)
+    psutil.net_io_counters = lambda: NetIO(50 * 1024**2, 200 * 1024**2)
+    psutil.disk_usage = lambda path: Disk(64 * 1024**3, 16 * 1024**3, 48 * 1024**3, 25.0)
+    psutil.virtual_memory = lambda: Memory(8 * 1024**3, 2 * 1024**3, 6 * 1024**3, 25.0)
+    psutil.sensors_temperatures = lambda: {}
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"],
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return "unknown"
+
+def render_frames(app, count):
+    """Renderiza count quadros e retorna os tempos em ms"""
+    times = []
+    for _ in range(count):
+        start = time.perf_counter()
+        app.render_frame()
+        pygame.event.pump()
+        times.append((time.perf_counter() - start) * 1000.0)
+    return times
+
+def measure_allocations(app, count):
+    """
+    Alocações por quadro via tracemalloc (pico de memória Python/NumPy acima
+    do início do quadro) e blocos que continuam vivos ao fim do quadro
+    """
+    peaks = []
+    blocks = []
+    tracemalloc.start()
+    try:
+        for _ in range(count):
+            tracemalloc.reset_peak()
+            base, _ = tracemalloc.get_traced_memory()
+            base_blocks = sys.getallocatedblocks()
+            app.render_frame()
+            pygame.event.pump()
+            _, peak = tracemalloc.get_traced_memory()
+            peaks.append((peak - base) / 1024.0)
+            blocks.append(sys.getallocatedblocks() - base_blocks)
+    finally:
+        tracemalloc.stop()
+    return peaks, blocks
+
+def run_case(app, frames, warmup, alloc_frames):
+    app.UI_RENDERER.invalidate()
+    render_frames(app, warmup)
+    times = render_frames(app, frames)
+    peaks, blocks = measure_allocations(app, alloc_frames)
+    mean = float(np.mean(times))
+    return {
+        "fps": 1000.0 / mean if mean else 0.0,
+        "frame_ms_mean": mean,
+        "frame_ms_p95": float(np.percentile(times, 95)),
+        "alloc_peak_kb_per_frame": float(np.mean(peaks)) if peaks else 0.0,
+        "alloc_live_blocks_per_frame": float(np.mean(blocks)) if blocks else 0.0,
+    }
+
+def run_benchmark(frames=60, warmup=5, alloc_frames=5, panels=None, effects=None, internal=False, workers=None,
+                  pipeline=False):
+    stub_environment()
+    import config
+    import main as app
+    from fonts import TEXT_CACHE
+
+    app.init_app()
+    # Qualidade máxima fixa: cada caso mede exatamente os efeitos da combinação
+    app.GOVERNOR.set_override(0)
+    app.apply_quality()
+    app.set_internal_resolution(internal)
+    app.set_pipeline(pipeline)
+
+    panels = panels or app.categories
+    combos = effects or [dict(zip(EFFECTS, values))
+                         for values in itertools.product((False, True), repeat=len(EFFECTS))]
+
+    # Threads do pós-processamento em faixas (padrão: o valor de defs.ini)
+    workers = workers or [int(config.DEFS.get('postfx_workers', 1))]
+
+    results = []
+    for panel in panels:
+        app.show_panel(app.categories.index(panel), persist=False)
+        for combo in combos:
+            config.DEFS.update(combo)
+            for count in workers:
+                config.DEFS['postfx_workers'] = count
+                case = run_case(app, frames, warmup, alloc_frames)
+                case.update({"panel": panel, "effects": combo, "workers": count})
+                results.append(case)
+                enabled = "+".join(name for name in EFFECTS if combo[name]) or "none"
+                print(f"{panel:<8} {enabled:<32} {count:2d}w {case['fps']:7.1f} fps  "
+                      f"{case['frame_ms_p95']:6.2f} ms p95  {case['alloc_peak_kb_per_frame']:8.1f} KB/quadro")
+
+    stats = TEXT_CACHE.stats()
+    print(f"\nCache de texto: {stats['hits']} acertos, {stats['misses']} falhas, "
+          f"{stats['evictions']} descartes, {stats['kb']:.0f} KB")
+
+    app.set_pipeline(False)
+    app.POSTFX.close()
+    pygame.quit()
+    return {
+        "revision": git_revision(),
+        "date": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "python": platform.python_version(),
+        "pygame": pygame.version.ver,
+        "numpy": np.__version__,
+        "resolution": [int(app.DEFS['width']), int(app.DEFS['height'])],
+        "render_resolution": list(app.TARGET.render_size),
+        "pipeline": pipeline,
+        "text_cache": TEXT_CACHE.stats(),
+        "frames": frames,
+        "results": results,
+    }
+
+def run_startup():
+    """Tempo e memória Python/NumPy alocada pelo init_app, em um processo novo"""
+    stub_environment()
+    import psutil
+    import main as app
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    app.init_app()
+    elapsed = (time.perf_counter() - start) * 1000.0
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    result = {
+        "revision": git_revision(),
+        "date": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "startup_ms": elapsed,
+        "alloc_kb": current / 1024.0,
+        "alloc_peak_kb": peak / 1024.0,
+        "rss_mb": psutil.Process().memory_info().rss / 1024.0**2,
+        "elements": len(app.ui.LAYOUT.nodes),
+    }
+    print(f"Inicialização: {elapsed:.0f} ms, {result['alloc_kb']:.0f} KB alocados "
+          f"(pico {result['alloc_peak_kb']:.0f} KB), {result['rss_mb']:.1f} MB RSS, {result['elements']} elementos")
+    app.POSTFX.close()
+    pygame.quit()
+    return result
+
+def case_key(case):
+    return (case["panel"], tuple(sorted(case["effects"].items())), case.get("workers", 1))
+
+def compare(current, previous):
+    """Imprime a variação de fps entre dois arquivos de resultado"""
+    old_cases = {case_key(case): case for case in previous["results"]}
+    print(f"\nComparação: {previous.get('revision')} -> {current.get('revision')}")
+    for case in current["results"]:
+        old = old_cases.get(case_key(case))
+        if not old or not old["fps"]:
+            continue
+        enabled = "+".join(name for name in EFFECTS if case["effects"][name]) or "none"
+        ratio = case["fps"] / old["fps"]
+        print(f"{case['panel']:<8} {enabled:<32} {case.get('workers', 1):2d}w "
+              f"{old['fps']:7.1f} -> {case['fps']:7.1f} fps  ({ratio:5.2f}x)")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark headless do loop de renderização")
+    parser.add_argument("--frames", type=int, default=60, help="Quadros medidos por caso")
+    parser.add_argument("--warmup", type=int, default=5, help="Quadros de aquecimento por caso")
+    parser.add_argument("--alloc-frames", type=int, default=5, help="Quadros medidos com tracemalloc")
+    parser.add_argument("--panels", nargs="*", help="Painéis de DICT['contentvals'] (padrão: todos)")
+    parser.add_argument("--internal", action="store_true",
+                        help="Desenha na resolução interna (dwidth x dheight) e escala para a janela")
+    parser.add_argument("--workers", type=int, nargs="*",
+                        help="Varre postfx_workers com estes valores (ex: 1 2 4)")
+    parser.add_argument("--pipeline", action="store_true",
+                        help="Pós-processamento em pipeline (um quadro de latência)")
+    parser.add_argument("--startup", action="store_true",
+                        help="Mede só a inicialização do app (tempo, memória, elementos)")
+    parser.add_argument("--output", default="benchmark_results.json", help="Arquivo JSON de saída")
+    parser.add_argument("--compare", help="JSON de uma execução anterior para comparar")
+    args = parser.parse_args()
+
+    if args.startup:
+        with open(args.output, "w") as f:
+            json.dump(run_startup(), f, indent=2)
+        print(f"\nResultados salvos em {args.output}")
+        return
+
+    results = run_benchmark(args.frames, args.warmup, args.alloc_frames, args.panels, internal=args.internal,
+                            workers=args.workers, pipeline=args.pipeline)
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResultados salvos em {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+
+if __name__ == "__main__":
+    main()
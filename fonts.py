@@ -0,0 +1,171 @@
+from collections import OrderedDict
+import pygame
+
+class TextCache:
+    """
+    Superfícies de texto já renderizadas, num LRU limitado por memória
+
+    A chave é (arquivo da fonte, tamanho, texto, cor, largura da quebra,
+    alinhamento), então um rótulo cujo valor não mudou (dia da semana, totais
+    do disco, !header...) nunca é rasterizado duas vezes. As superfícies são
+    compartilhadas entre elementos e não devem ser modificadas.
+    """
+    def __init__(self, max_bytes=16 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.surfaces = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def surface_bytes(surface):
+        return surface.get_width() * surface.get_height() * surface.get_bytesize()
+
+    def get(self, key, render):
+        """
+        Retorna a superfície de key, chamando render() só se ela não está no cache
+
+        Args:
+            key: (arquivo, tamanho, texto, cor, largura, alinhamento)
+            render: Função sem argumentos que rasteriza o texto
+        """
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.surfaces.move_to_end(key)
+            self.hits += 1
+            return surface
+
+        self.misses += 1
+        surface = render()
+        size = self.surface_bytes(surface)
+        if size > self.max_bytes:
+            return surface  # Maior que o cache inteiro: não guarda
+        self.surfaces[key] = surface
+        self.bytes += size
+        while self.bytes > self.max_bytes:
+            _, old = self.surfaces.popitem(last=False)
+            self.bytes -= self.surface_bytes(old)
+            self.evictions += 1
+        return surface
+
+    def clear(self):
+        self.surfaces.clear()
+        self.bytes = 0
+
+    def stats(self):
+        """Contadores para o benchmark: acertos, falhas, descartes e memória usada"""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "evictions": self.evictions,
+            "entries": len(self.surfaces),
+            "kb": self.bytes / 1024.0,
+        }
+
+TEXT_CACHE = TextCache()
+
+class FontRegistry:
+    """
+    Uma pygame.font.Font por (arquivo, tamanho em px), compartilhada pela árvore
+
+    Carregar a fonte lê e interpreta o .ttf; com o registro isso acontece uma
+    vez por tamanho, e não a cada elemento criado ou hover.
+    """
+    def __init__(self):
+        self.fonts = {}
+        self.widths = {}  # (arquivo, tamanho) -> CharWidths
+
+    def get(self, file, size):
+        key = (file, int(size))
+        loaded = self.fonts.get(key)
+        if loaded is None:
+            loaded = self.fonts[key] = pygame.font.Font(file, key[1])
+        return loaded
+
+    def preload(self, file, sizes):
+        """Carrega de uma vez os tamanhos informados"""
+        for size in sizes:
+            self.get(file, size)
+
+    def sizes(self, file=None):
+        """Tamanhos carregados (de um arquivo, ou de todos)"""
+        return sorted({size for loaded_file, size in self.fonts if file is None or loaded_file == file})
+
+    def char_widths(self, file, size):
+        """Tabela de larguras por caractere da fonte (file, size)"""
+        key = (file, int(size))
+        table = self.widths.get(key)
+        if table is None:
+            table = self.widths[key] = CharWidths(self.get(file, size))
+        return table
+
+    def clear(self):
+        """Descarta as fontes (ex: a resolução mudou e os tamanhos em px junto)"""
+        self.fonts.clear()
+        self.widths.clear()
+
+class CharWidths:
+    """
+    Largura de texto somando o avanço de cada caractere, medido uma vez
+
+    Evita renderizar superfícies de teste: medir um texto custa uma busca no
+    dicionário por caractere. Ignora kerning (a Jersey10 é uma fonte pixelada).
+    """
+    def __init__(self, font):
+        self.font = font
+        self.widths = {}
+
+    def char(self, ch):
+        width = self.widths.get(ch)
+        if width is None:
+            width = self.widths[ch] = self.font.size(ch)[0]
+        return width
+
+    def text(self, text):
+        """Largura em px de text"""
+        widths = self.widths
+        total = 0
+        for ch in text:
+            width = widths.get(ch)
+            if width is None:
+                width = self.char(ch)
+            total += width
+        return total
+
+FONTS = FontRegistry()
+
+def wrap_words(widths, words, max_width):
+    """
+    Quebra de linha gulosa em uma passada: junta palavras enquanto a linha
+    cabe em max_width; uma palavra mais larga que a caixa fica sozinha
+
+    Args:
+        widths: CharWidths da fonte
+        words: Palavras na ordem do texto
+        max_width: Largura máxima da linha em px
+
+    Returns:
+        Lista com o texto de cada linha
+    """
+    space = widths.char(' ')
+    lines = []
+    current = []
+    current_width = 0
+    for word in words:
+        word_width = widths.text(word)
+        test_width = current_width + space + word_width if current else word_width
+        if test_width <= max_width:
+            current.append(word)
+            current_width = test_width
+        elif current:
+            lines.append(' '.join(current))
+            current = [word]
+            current_width = word_width
+        else:
+            lines.append(word)
+    if current:
+        lines.append(' '.join(current))
+    return lines
@@ -1,20 +1,22 @@
 import pygame
+import numpy as np
+from collections import OrderedDict
 from config import DEFS
+from motion import MotionTracker
+import assets
 
 SCREEN = None
 SHEET = None
 PROPSYS = None
 SPRITE_LOADER = None
-crt_texture = None
 
 def init_graphics(screen, sheet, propsys,glock):
-    global SCREEN, SHEET, PROPSYS, SPRITE_LOADER, crt_texture, crt_overlay, GLOCK
+    global SCREEN, SHEET, PROPSYS, SPRITE_LOADER, GLOCK
     SCREEN = screen
     SHEET = sheet
     GLOCK = glock
     PROPSYS = propsys
     SPRITE_LOADER = spriteLoader()
-    crt_overlay = pygame.Surface((int(DEFS['width']), int(DEFS['height'])), pygame.SRCALPHA)
     SPRITE_LOADER.create_sprite(
     key="crt_frame",
     position=(101, 0),
@@ -89,9 +91,18 @@ def init_graphics(screen, sheet, propsys,glock):
     
     return SPRITE_LOADER
 
+def set_screen(screen, propsys):
+    """Troca a superfície de desenho (ex: resolução interna ligada/desligada)"""
+    global SCREEN, PROPSYS
+    SCREEN = screen
+    PROPSYS = propsys
+
 class spriteLoader:
-    def __init__(self):
+    def __init__(self, max_variants=64):
         self.sprites = {}
+        # Variantes escaladas já no formato da tela: (key, tamanho, alpha) -> Surface
+        self.variants = OrderedDict()
+        self.max_variants = max_variants
         # Assume que deveria ser o PROPSYS global
         
     def create_sprite(self, key, position, size, scale=1.0, alpha=255, angle=0):
@@ -105,8 +116,12 @@ class spriteLoader:
             new_width = int(width * scale)
             new_height = int(height * scale)
             sprite = pygame.transform.scale(sprite, (new_width, new_height))
+        sprite = assets.to_display(sprite)
         if alpha != 255:
             sprite.set_alpha(alpha)
+        # Recriar um sprite (ex: troca de resolução) invalida suas variantes
+        for variant_key in [k for k in self.variants if k[0] == key]:
+            del self.variants[variant_key]
         self.sprites[key] = {
             "sprite": sprite,
             "size": (width, height),
@@ -161,18 +176,76 @@ class spriteLoader:
             size=(size[0],size[1])
             self.draw_relative_to_sprite(key,startpos,size,color=(0,0,0))  
         return True
-    def draw_overlay(self,key):
-        sprite = self.sprites.get(key)["sprite"]
-        for y in range(0, int(DEFS['height']),int(DEFS['crtsize'])):
-            for x in range(0, int(DEFS['width']),int(DEFS['crtsize'])):
-                SCREEN.blit(sprite, (x, y))
-                        
     def get_sprite(self, key):
         return self.sprites.get(key)
 
+    def get_scaled(self, key, size, alpha=None):
+        """
+        Retorna o sprite escalado para size, pronto para assets.blit
+
+        As variantes ficam num cache LRU por (key, tamanho, alpha), então
+        ícones com hover custam só um blit por quadro.
+
+        Args:
+            key: Nome do sprite
+            size: Tamanho final (largura, altura)
+            alpha: Transparência (padrão: a do sprite)
+        """
+        sprite_data = self.sprites.get(key)
+        if not sprite_data:
+            return None
+        if alpha is None:
+            alpha = sprite_data["alpha"]
+        variant_key = (key, tuple(size), alpha)
+        variant = self.variants.get(variant_key)
+        if variant is not None:
+            self.variants.move_to_end(variant_key)
+            return variant
+
+        variant = pygame.transform.scale(sprite_data["sprite"], variant_key[1])
+        if alpha != 255:
+            variant.set_alpha(alpha)
+        variant = assets.prepare(variant)
+        self.variants[variant_key] = variant
+        if len(self.variants) > self.max_variants:
+            self.variants.popitem(last=False)
+        return variant
+
 class TeeVee:
-    def __init__(self):
-        scal=DEFS["width"]/150
+    def __init__(self, max_faces=96):
+        # Rostos compostos: (x, y, face_state) -> (superfície, posição)
+        self.face_cache = OrderedDict()
+        self.max_faces = max_faces
+        self.create_sprites()
+        self.eyes = "eye_closed"
+        self.mouth = "mouth_smile"
+        # Sistema de animação de fala
+        self.x_percent = 0.5
+        self.y_percent = 0.35
+        self.is_talking = False
+        self.talk_text = ""
+        self.talk_index = 0
+        self.talk_timer = 0
+        self.mouth_open = False
+        self.talk_sound_due = False  # Som de fala a tocar no próximo update
+        self.frame_offset_y = 0  # Offset vertical para movimento do frame
+        self.letter_duration = 100  # Milissegundos por letra
+        self.ticks = 0  # Instante do último update, base para as piscadas
+        
+        # Sistema de movimento dos olhos (segue o mouse)
+        self.eye_offset_x = 0  # Offset horizontal dos olhos (-1, 0, 1)
+        self.eye_offset_y = 0  # Offset vertical dos olhos (-1, 0, 1)
+        
+        # Sistema de detecção de movimento frenético (tontura)
+        self.motion = MotionTracker()  # Movimento do mouse no último segundo (via MOUSEMOTION)
+        self.is_dizzy = False  # Se está tonto
+        self.dizzy_timer = 0  # Timer para duração da tontura
+        self.dizzy_duration = 3000  # Fica tonto por 3 segundos
+        self.movement_threshold = 10  # Número de movimentos rápidos para ficar tonto (reduzido de 15)
+        
+    def create_sprites(self):
+        """Cria os sprites do rosto na escala da resolução de desenho atual"""
+        scal=PROPSYS.screen_width/150
         SPRITE_LOADER.create_sprite(
             key="frame",
             position=(0, 0),
@@ -237,30 +310,12 @@ class TeeVee:
             size=(3, 1),
             scale=scal
         )
-        self.eyes = "eye_closed"
-        self.mouth = "mouth_smile"
-        # Sistema de animação de fala
-        self.x_percent = 0.5
-        self.y_percent = 0.35
-        self.is_talking = False
-        self.talk_text = ""
-        self.talk_index = 0
-        self.talk_timer = 0
-        self.mouth_open = False
-        self.frame_offset_y = 0  # Offset vertical para movimento do frame
-        self.letter_duration = 100  # Milissegundos por letra
-        
-        # Sistema de movimento dos olhos (segue o mouse)
-        self.eye_offset_x = 0  # Offset horizontal dos olhos (-1, 0, 1)
-        self.eye_offset_y = 0  # Offset vertical dos olhos (-1, 0, 1)
-        
-        # Sistema de detecção de movimento frenético (tontura)
-        self.mouse_movements = []  # Lista de posições recentes do mouse
-        self.is_dizzy = False  # Se está tonto
-        self.dizzy_timer = 0  # Timer para duração da tontura
-        self.dizzy_duration = 3000  # Fica tonto por 3 segundos
-        self.movement_threshold = 10  # Número de movimentos rápidos para ficar tonto (reduzido de 15)
-        
+
+    def resize(self):
+        """Recria os sprites depois de uma troca de resolução de desenho"""
+        self.face_cache.clear()
+        self.create_sprites()
+
     def start_talking(self, text):
         """Inicia a animação de fala com o texto fornecido"""
         self.is_talking = True
@@ -268,9 +323,15 @@ class TeeVee:
         self.talk_index = 0
         self.talk_timer = pygame.time.get_ticks()
         self.mouth = "mouth_open"
+        self.talk_sound_due = not self.mouth_open
         
+    def track_mouse(self, pos):
+        """Registra um MOUSEMOTION (posição em coordenadas de desenho)"""
+        self.motion.add(pos, pygame.time.get_ticks())
+
     def update(self):
         """Atualiza a animação de fala e movimento dos olhos"""
+        self.ticks = pygame.time.get_ticks()
         # Atualiza animação de fala
         if self.is_talking:
             current_time = pygame.time.get_ticks()
@@ -286,45 +347,46 @@ class TeeVee:
                     self.frame_offset_y = -2
                 else:
                     self.frame_offset_y = 2
+                    self.talk_sound_due = True
                 
                 if self.talk_index >= len(self.talk_text):
                     self.is_talking = False
                     self.mouth_open = False
+                    self.talk_sound_due = False
                     self.frame_offset_y = 0
                     self.mouth = "mouth_smile"
         else:
             self.frame_offset_y = 0
-        
+
+        # Som de fala no ritmo da boca (a cada vez que ela fecha), e não de
+        # quando o rosto é redesenhado
+        if self.talk_sound_due:
+            self.talk_sound_due = False
+            GLOCK.player.play_sound("talk")
+
         # Atualiza movimento dos olhos para seguir o mouse
-        mouse_x, mouse_y = pygame.mouse.get_pos()
-        screen_width = DEFS['width']
-        screen_height = DEFS['height']
+        screen_width = PROPSYS.screen_width
+        screen_height = PROPSYS.screen_height
         
         # Calcula posição do TeeVee na tela
         tv_x = self.x_percent * screen_width
         tv_y = self.y_percent * screen_height
         
-        # Calcula diferença entre mouse e TeeVee
+        # Calcula diferença entre mouse e TeeVee (parado até o primeiro movimento)
+        mouse_x, mouse_y = self.motion.position or (tv_x, tv_y)
         dx = mouse_x - tv_x
         dy = mouse_y - tv_y
         
         # Detecta movimento frenético do mouse
         current_time = pygame.time.get_ticks()
         
-        # Adiciona posição atual à lista com timestamp
-        self.mouse_movements.append((mouse_x, mouse_y, current_time))
-        
         # Remove movimentos antigos (mais de 1 segundo)
-        self.mouse_movements = [(x, y, t) for x, y, t in self.mouse_movements if current_time - t < 1000]
+        self.motion.expire(current_time)
         
         # Verifica se há movimento frenético (muitas mudanças de direção)
-        if len(self.mouse_movements) >= self.movement_threshold and not self.is_dizzy:
-            # Calcula distância total percorrida
-            total_distance = 0
-            for i in range(1, len(self.mouse_movements)):
-                x1, y1, _ = self.mouse_movements[i-1]
-                x2, y2, _ = self.mouse_movements[i]
-                total_distance += abs(x2 - x1) + abs(y2 - y1)
+        if self.motion.count >= self.movement_threshold and not self.is_dizzy:
+            # Distância total percorrida (soma corrente do MotionTracker)
+            total_distance = self.motion.distance
             
             # Se percorreu muita distância em pouco tempo, fica tonto
             # Reduzido de 2x para 1x a largura da tela
@@ -332,7 +394,7 @@ class TeeVee:
                 self.is_dizzy = True
                 
                 self.dizzy_timer = current_time
-                self.mouse_movements = []  # Limpa lista
+                self.motion.clear()  # Limpa histórico
                 print(f"🌀 TeeVee ficou TONTO! Distância: {total_distance:.0f}px")
         
         # Verifica se deve sair do estado tonto
@@ -359,16 +421,58 @@ class TeeVee:
             else:  # Mouse no centro
                 self.eye_offset_y = 0
                 
-    def draw(self,x_percent,y_percent):
+    def face_state(self):
+        """
+        Estado visual atual do rosto: (olho direito, olho esquerdo, boca,
+        offset x dos olhos, offset y dos olhos, offset vertical da fala)
+        """
+        ticks = self.ticks
+        # Se está tonto, fica de olhos fechados; senão, pisca normalmente
+        if self.is_dizzy or ticks % 5000 < 200:
+            eyes = "eye_closed"
+        else:
+            eyes = "eye_open"
+        # Olho esquerdo - pisca diferente, mas também fecha quando tonto
+        if self.is_dizzy or ticks % 7000 < 200:
+            leye = "eye_closed"
+        else:
+            leye = eyes
+        if self.is_talking:
+            mouth = "mouth_midopen" if self.mouth_open else "mouth_open"
+            frame_offset_y = self.frame_offset_y
+        else:
+            mouth = self.mouth
+            frame_offset_y = 0
+        return (eyes, leye, mouth, self.eye_offset_x, self.eye_offset_y, frame_offset_y)
+
+    def next_change(self, ticks):
+        """Milissegundos até a próxima piscada começar ou terminar (rosto parado)"""
+        delays = []
+        for period in (5000, 7000):
+            phase = ticks % period
+            delays.append(200 - phase if phase < 200 else period - phase)
+        return min(delays)
+
+    def get_bounds(self, x_percent, y_percent):
+        """Retângulo que contém o TeeVee desenhado em (x_percent, y_percent)"""
+        sprite = SPRITE_LOADER.get_sprite("frame")["sprite"]
+        rect = sprite.get_rect()
+        rect.center = (PROPSYS.percent_to_px_x(x_percent), PROPSYS.percent_to_px_y(y_percent))
+        # Margem para o balanço vertical durante a fala
+        return rect.inflate(4, 8)
+
+    def face_layout(self, x_percent, y_percent, state):
+        """Sprites do rosto e suas posições na tela, na ordem de desenho"""
+        eyes, leye, mouth, eye_offset_x_units, eye_offset_y_units, frame_offset_y = state
+
         # Calcula offset Y baseado na animação
         center_y = y_percent
         center_x = x_percent
-        if self.is_talking:
-            # Adiciona pequeno offset durante a fala
-            center_y += self.frame_offset_y / 1000.0  # Converte para porcentagem
+        # Adiciona pequeno offset durante a fala
+        center_y += frame_offset_y / 1000.0  # Converte para porcentagem
         
         # Frame
-        SPRITE_LOADER.draw_sprite_centered("frame", x_percent, center_y)
+        layout = [("frame", x_percent, center_y)]
         
         # Calcula offsets proporcionais ao tamanho da tela
         # Sprite do frame tem 22x36 pixels
@@ -383,43 +487,58 @@ class TeeVee:
         # Olhos com movimento horizontal
         center_y += eye_offset_y
         
-        # Se está tonto, usa olhos de raiva
-        if self.is_dizzy:
-            self.eyes = "eye_closed"
-        # Senão, pisca normalmente
-        elif pygame.time.get_ticks() % 5000 < 200:
-            self.eyes = "eye_closed"
-        else:
-            self.eyes = "eye_open"
-        
         # Aplica offset horizontal e vertical para movimento dos olhos
-        eye_center_x = center_x - eye_offset_x + (self.eye_offset_x * 0.01)  # Offset de 1% por unidade
-        eye_center_y = center_y + (self.eye_offset_y * 0.005)  # Offset vertical
-        SPRITE_LOADER.draw_sprite_centered(self.eyes, eye_center_x, eye_center_y)
+        eye_center_x = center_x - eye_offset_x + (eye_offset_x_units * 0.01)  # Offset de 1% por unidade
+        eye_center_y = center_y + (eye_offset_y_units * 0.005)  # Offset vertical
+        layout.append((eyes, eye_center_x, eye_center_y))
         
-        # Olho esquerdo - pisca diferente, mas também fica com raiva quando tonto
-        if self.is_dizzy:
-            leye = "eye_closed"
-        elif pygame.time.get_ticks() % 7000 < 200:
-            leye = "eye_closed"
-        else:
-            leye = self.eyes
         # Aplica mesmo offset ao olho esquerdo
-        left_eye_center_x = center_x + eye_offset_x + (self.eye_offset_x * 0.01)
-        left_eye_center_y = center_y + (self.eye_offset_y * 0.005)
-        SPRITE_LOADER.draw_sprite_centered(leye, left_eye_center_x, left_eye_center_y)
+        left_eye_center_x = center_x + eye_offset_x + (eye_offset_x_units * 0.01)
+        left_eye_center_y = center_y + (eye_offset_y_units * 0.005)
+        layout.append((leye, left_eye_center_x, left_eye_center_y))
         
-        # Posiciona boca abaixo dos olhos
-        mouth_y = center_y + mouth_offset_from_eyes
-        if self.is_talking:
-            # Adiciona offset de animação
-            mouth_y += self.frame_offset_y / 1000.0
-            self.mouth="mouth_midopen" if self.mouth_open else "mouth_open"
-            if not self.mouth_open:           
-                GLOCK.player.play_sound("talk")
+        # Posiciona boca abaixo dos olhos (com o offset da fala, que é 0 parado)
+        mouth_y = center_y + mouth_offset_from_eyes + frame_offset_y / 1000.0
+        layout.append((mouth, center_x, mouth_y))
 
-        SPRITE_LOADER.draw_sprite_centered(self.mouth, center_x, mouth_y)
-        
+        # Mesmo arredondamento de draw_sprite_centered
+        placed = []
+        for key, x, y in layout:
+            sprite = SPRITE_LOADER.get_sprite(key)["sprite"]
+            rect = sprite.get_rect()
+            rect.topleft = (PROPSYS.percent_to_px_x(x) - rect.width // 2,
+                            PROPSYS.percent_to_px_y(y) - rect.height // 2)
+            placed.append((sprite, rect))
+        return placed
+
+    def get_face(self, x_percent, y_percent, state):
+        """
+        Rosto já composto para o estado e a posição: (superfície, posição)
+
+        Cada combinação de olhos, boca e offsets é montada uma vez e guardada
+        num cache LRU, limpo quando a resolução muda.
+        """
+        key = (x_percent, y_percent, state)
+        face = self.face_cache.get(key)
+        if face is not None:
+            self.face_cache.move_to_end(key)
+            return face
+
+        placed = self.face_layout(x_percent, y_percent, state)
+        bounds = placed[0][1].unionall([rect for _, rect in placed[1:]])
+        surface = pygame.Surface(bounds.size, pygame.SRCALPHA)
+        for sprite, rect in placed:
+            surface.blit(sprite, rect.move(-bounds.x, -bounds.y))
+        face = (assets.prepare(surface), bounds.topleft)
+        self.face_cache[key] = face
+        if len(self.face_cache) > self.max_faces:
+            self.face_cache.popitem(last=False)
+        return face
+
+    def draw(self, screen, x_percent, y_percent):
+        """Desenha o rosto em screen; o estado vem do último update"""
+        surface, position = self.get_face(x_percent, y_percent, self.face_state())
+        assets.blit(screen, surface, position)
         return True
     
     def draw_rect(self, x, y, w, h, color=(255, 255, 255)):
@@ -430,115 +549,276 @@ class TeeVee:
         """
         SPRITE_LOADER.draw_relative_to_sprite("frame", startpos=(x, y), size=(w, h), color=color)
 
-def apply_crt_effect():
-    # Limpar a overlay
-    crt_overlay.fill((0, 0, 0, 0))  # Clear with transparent
-    
-    # Aplicar a textura CRT repetidamente em toda a tela
-    sprite = SPRITE_LOADER.get_sprite("crt_frame")["sprite"]
-    for y in range(0, int(DEFS['height']), int(DEFS['crtsize'])):
-        for x in range(0, int(DEFS['width']), int(DEFS['crtsize'])):
-            crt_overlay.blit(sprite, (x, y))
-    
-    return crt_overlay
-def apply_scanlines(surface, rect, spacing=4, intensity=15, offset=0):
-    """Linhas de varredura - efeito retro/CRT com animação"""
-    scanlines = pygame.Surface((rect.width, rect.height), pygame.SRCALPHA)
-    
-    # Offset animado para movimento
-    animated_offset = int(offset) % spacing
-    
-    for y in range(-spacing, rect.height + spacing, spacing):
-        y_pos = y + animated_offset
-        if 0 <= y_pos < rect.height:
-            pygame.draw.line(scanlines, (0, 0, 0, intensity), (0, y_pos), (rect.width, y_pos))
-    
-    surface.blit(scanlines, (0, 0))
-    return surface
+def build_crt_texture(size, crtsize):
+    """
+    Constrói a textura CRT de tela cheia (sprite crt_frame repetido em grade)
+
+    Só a primeira linha da grade é desenhada sprite a sprite; as demais são
+    copiadas em faixas que dobram de altura a cada passo.
+    """
+    width, height = size
+    step = max(1, int(crtsize))
+    sprite = SPRITE_LOADER.create_sprite(
+    key="crt_frame",
+    position=(101, 0),
+    size=(16, 16),
+    scale=step/16,
+    alpha=50
+    )
+
+    texture = pygame.Surface((width, height), pygame.SRCALPHA)
+    for x in range(0, width, step):
+        texture.blit(sprite, (x, 0))
+
+    # Sobre pixels transparentes, BLEND_RGBA_MAX copia a faixa sem misturar
+    filled = step
+    while filled < height:
+        band_height = min(filled, height - filled)
+        band = texture.subsurface((0, 0, width, band_height)).copy()
+        texture.blit(band, (0, filled), special_flags=pygame.BLEND_RGBA_MAX)
+        filled += band_height
+    return texture
+
+class DistortionEngine:
+    """
+    Distorção de barril com tabelas de remapeamento pré-calculadas
+
+    Os índices de origem e os pesos da interpolação bilinear dependem apenas
+    do tamanho da tela e da força da distorção, então são calculados uma vez
+    por (largura, altura, força) e guardados num cache LRU pequeno.
+    A cada quadro resta apenas um "gather" dos pixels.
+
+    Com pesos em ponto fixo o resultado difere da interpolação em ponto
+    flutuante em no máximo 2 níveis por canal (MAX_ERROR).
+    """
+    MAX_ERROR = 2
+    # Pesos em ponto fixo: cada um dos quatro pesos arredondado para 1/256,
+    # com soma exata de 256 (o máximo que cabe nos 16 bits de cada canal)
+    WEIGHT_ONE = 256
+    # Canais intercalados (byte 0 e 2 / byte 1 e 3) para processar os 4 canais
+    # de um pixel de 32 bits com duas multiplicações inteiras
+    LANES = 0x00FF00FF
+
+    def __init__(self, max_tables=4):
+        self.max_tables = max_tables
+        self.tables = OrderedDict()
+        self.buffers = {}
+
+    def get_tables(self, width, height, strength):
+        """Retorna (e cacheia) as tabelas de remapeamento para o tamanho e força"""
+        key = (width, height, round(float(strength), 4))
+        tables = self.tables.get(key)
+        if tables is not None:
+            self.tables.move_to_end(key)
+            return tables
+
+        tables = self._build_tables(width, height, strength)
+        self.tables[key] = tables
+        if len(self.tables) > self.max_tables:
+            self.tables.popitem(last=False)
+        return tables
+
+    def _build_tables(self, width, height, strength):
+        # Centro da tela
+        center_x = width / 2
+        center_y = height / 2
+
+        # Distância do centro (normalizada), em layout (altura, largura)
+        dx = ((np.arange(width) - center_x) / center_x)[np.newaxis, :]
+        dy = ((np.arange(height) - center_y) / center_y)[:, np.newaxis]
+        distortion_factor = 1 + strength * (dx ** 2 + dy ** 2)
+
+        source_x = center_x + dx * distortion_factor * center_x
+        source_y = center_y + dy * distortion_factor * center_y
+
+        x0 = np.floor(source_x).astype(np.int64)
+        y0 = np.floor(source_y).astype(np.int64)
+        valid = (x0 >= 0) & (x0 < width - 1) & (y0 >= 0) & (y0 < height - 1)
+
+        # Pesos bilineares em ponto fixo: arredonda os quatro produtos (não os
+        # eixos) e devolve a sobra do arredondamento ao maior deles
+        one = self.WEIGHT_ONE
+        fx = source_x - x0
+        fy = source_y - y0
+        weights = np.rint(np.stack((
+            (1 - fx) * (1 - fy),
+            fx * (1 - fy),
+            (1 - fx) * fy,
+            fx * fy,
+        )) * one).astype(np.int32)
+        largest = np.argmax(weights, axis=0)[np.newaxis]
+        residual = one - weights.sum(axis=0)
+        np.put_along_axis(weights, largest,
+                          np.take_along_axis(weights, largest, axis=0) + residual, axis=0)
+        # Pixels fora da imagem ficam pretos: todos os pesos zerados
+        weights = tuple(np.where(valid, w, 0).astype(np.uint16) for w in weights)
+
+        # Índice do vizinho superior esquerdo no buffer achatado; os outros três
+        # vizinhos são lidos de visões deslocadas do mesmo buffer (+1, +w, +w+1)
+        index = np.where(valid, y0 * width + x0, 0).astype(np.intp)
+
+        return {"index": index, "weights": weights, "variants": {}}
+
+    def get_weights(self, tables, scanlines=None):
+        """
+        Retorna os pesos da tabela, opcionalmente com scanlines embutidas
+
+        Args:
+            tables: Tabelas retornadas por get_tables
+            scanlines: None ou (espaçamento, intensidade, fase). As linhas
+                escurecidas têm os pesos reduzidos, fundindo as scanlines
+                no mesmo gather da distorção.
+        """
+        if scanlines is None:
+            return tables["weights"]
+
+        weights = tables["variants"].get(scanlines)
+        if weights is None:
+            spacing, intensity, phase = scanlines
+            factor = 255 - intensity
+            weights = tuple(w.copy() for w in tables["weights"])
+            for w in weights:
+                rows = w[phase::spacing]
+                rows[...] = (rows.astype(np.uint32) * factor + 127) // 255
+            tables["variants"][scanlines] = weights
+        return weights
+
+    def _get_buffers(self, width, height):
+        """Buffers de trabalho reaproveitados entre quadros"""
+        buffers = self.buffers.get((width, height))
+        if buffers is None:
+            self.buffers.clear()
+            shape = (height, width)
+            buffers = {
+                "source": np.empty(shape, dtype=np.uint32),
+                "gather": np.empty(shape, dtype=np.uint32),
+                "low": np.empty(shape, dtype=np.uint32),
+                "high": np.empty(shape, dtype=np.uint32),
+                "scratch": np.empty(shape, dtype=np.uint32),
+            }
+            self.buffers[(width, height)] = buffers
+        return buffers
+
+    def remap(self, source_surface, dest_surface, distortion_strength=0.04, scanlines=None, pool=None, bands=1):
+        """
+        Aplica a distorção de source_surface em dest_surface (podem ser a mesma)
+
+        Args:
+            source_surface: Superfície original
+            dest_surface: Superfície de destino, com o mesmo tamanho
+            distortion_strength: Força da distorção (0.0 = sem distorção)
+            scanlines: None ou (espaçamento, intensidade, fase) para escurecer
+                as linhas de varredura no mesmo passo
+            pool: Executor (concurrent.futures) para processar faixas em paralelo
+            bands: Número de faixas horizontais quando há pool
+        """
+        width, height = source_surface.get_size()
+        tables = self.get_tables(width, height, distortion_strength)
+        weights = self.get_weights(tables, scanlines)
+
+        if source_surface.get_bytesize() != 4 or dest_surface.get_bytesize() != 4:
+            self._remap_rgb(source_surface, dest_surface, tables, weights)
+            return dest_surface
+
+        buffers = self._get_buffers(width, height)
+        source = buffers["source"]
+        index = tables["index"]
+
+        if pool is None or bands <= 1:
+            source_view = pygame.surfarray.pixels2d(source_surface)
+            np.copyto(source, source_view.T)
+            del source_view
+
+            result = self._gather(source, index, weights, buffers)
+
+            dest_view = pygame.surfarray.pixels2d(dest_surface)
+            dest_view.T[...] = result
+            del dest_view
+            return dest_surface
+
+        # Em faixas: o NumPy libera o GIL nas operações grandes. Cada pixel de
+        # saída depende só da cópia completa da origem, então as faixas dão o
+        # mesmo resultado, bit a bit, que o passo único.
+        source_view = pygame.surfarray.pixels2d(source_surface).T
+        dest_view = pygame.surfarray.pixels2d(dest_surface).T
+        rows = split_bands(height, bands)
+
+        def copy_band(band):
+            start, end = band
+            np.copyto(source[start:end], source_view[start:end])
+
+        def gather_band(band):
+            start, end = band
+            band_buffers = {name: buffer[start:end] for name, buffer in buffers.items()}
+            dest_view[start:end] = self._gather(source, index[start:end],
+                                                tuple(w[start:end] for w in weights), band_buffers)
+
+        # A origem precisa estar toda copiada antes do gather (pode ser o destino)
+        list(pool.map(copy_band, rows))
+        list(pool.map(gather_band, rows))
+        del source_view, dest_view
+        return dest_surface
+
+    def _gather(self, source, index, weights, buffers):
+        """Interpolação bilinear com pesos inteiros, dois canais por operação"""
+        width = source.shape[1]
+        flat = source.ravel()
+        neighbours = (flat, flat[1:], flat[width:], flat[width + 1:])
+        low = buffers["low"]
+        high = buffers["high"]
+
+        for i, (base, weight) in enumerate(zip(neighbours, weights)):
+            # O primeiro vizinho escreve direto nos acumuladores
+            lanes = low if i == 0 else buffers["gather"]
+            shifted = high if i == 0 else buffers["scratch"]
+            np.take(base, index, out=lanes, mode='clip')
+            # Bytes 1 e 3
+            np.right_shift(lanes, 8, out=shifted)
+            shifted &= self.LANES
+            shifted *= weight
+            # Bytes 0 e 2
+            lanes &= self.LANES
+            lanes *= weight
+            if i > 0:
+                low += lanes
+                high += shifted
+
+        low >>= 8
+        low &= self.LANES
+        high &= ~np.uint32(self.LANES)
+        low |= high
+        return low
+
+    def _remap_rgb(self, source_surface, dest_surface, tables, weights):
+        """Caminho genérico para superfícies que não são de 32 bits"""
+        width, height = source_surface.get_size()
+        source = pygame.surfarray.array3d(source_surface).transpose(1, 0, 2).reshape(-1, 3)
+        neighbours = (source, source[1:], source[width:], source[width + 1:])
+        result = np.zeros((height, width, 3), dtype=np.uint32)
+        for base, weight in zip(neighbours, weights):
+            result += base[tables["index"]] * weight[..., np.newaxis]
+        result >>= 8
+        pygame.surfarray.blit_array(dest_surface, result.astype(np.uint8).transpose(1, 0, 2))
+
+
+def split_bands(height, count):
+    """Divide as linhas [0, height) em até count faixas contíguas (início, fim)"""
+    step = -(-height // max(1, count))
+    return [(start, min(start + step, height)) for start in range(0, height, step)]
+
+DISTORTION = DistortionEngine()
+
 def apply_barrel_distortion(source_surface, distortion_strength=0.04):
     """
     Aplica distorção de barril a uma superfície (efeito CRT) com interpolação suave
-    Otimizado com numpy para melhor performance
-    
+    Usa as tabelas pré-calculadas de DISTORTION
+
     Args:
         source_surface: Superfície original
         distortion_strength: Força da distorção (0.0 = sem distorção, 0.5 = muito curvado)
-    
+
     Returns:
         Nova superfície com distorção aplicada
     """
-    import math
-    import numpy as np
-    
-    width, height = source_surface.get_size()
-    
-    # Converte superfície para array numpy
-    source_array = pygame.surfarray.array3d(source_surface)
-    
-    # Cria arrays de coordenadas
-    x_coords = np.arange(width)
-    y_coords = np.arange(height)
-    x_grid, y_grid = np.meshgrid(x_coords, y_coords)
-    
-    # Centro da tela
-    center_x = width / 2
-    center_y = height / 2
-    
-    # Calcula distância do centro (normalizada)
-    dx = (x_grid - center_x) / center_x
-    dy = (y_grid - center_y) / center_y
-    distance = np.sqrt(dx**2 + dy**2)
-    
-    # Aplica distorção de barril
-    distortion_factor = 1 + distortion_strength * (distance ** 2)
-    
-    # Calcula novas posições
-    new_dx = dx * distortion_factor
-    new_dy = dy * distortion_factor
-    
-    source_x = center_x + new_dx * center_x
-    source_y = center_y + new_dy * center_y
-    
-    # Interpolação bilinear
-    x0 = np.floor(source_x).astype(int)
-    y0 = np.floor(source_y).astype(int)
-    x1 = x0 + 1
-    y1 = y0 + 1
-    
-    # Pesos para interpolação
-    wx = source_x - x0
-    wy = source_y - y0
-    
-    # Máscara para pixels válidos
-    valid_mask = (x0 >= 0) & (x0 < width - 1) & (y0 >= 0) & (y0 < height - 1)
-    
-    # Cria array de saída
-    distorted_array = np.zeros((height, width, 3), dtype=np.uint8)
-    
-    # Aplica interpolação apenas para pixels válidos
-    for channel in range(3):
-        c00 = source_array[x0[valid_mask], y0[valid_mask], channel]
-        c10 = source_array[x1[valid_mask], y0[valid_mask], channel]
-        c01 = source_array[x0[valid_mask], y1[valid_mask], channel]
-        c11 = source_array[x1[valid_mask], y1[valid_mask], channel]
-        
-        wx_valid = wx[valid_mask]
-        wy_valid = wy[valid_mask]
-        
-        interpolated = (
-            c00 * (1 - wx_valid) * (1 - wy_valid) +
-            c10 * wx_valid * (1 - wy_valid) +
-            c01 * (1 - wx_valid) * wy_valid +
-            c11 * wx_valid * wy_valid
-        )
-        
-        distorted_array[valid_mask, channel] = np.clip(interpolated, 0, 255).astype(np.uint8)
-    
-    # Converte de volta para superfície pygame
-    # Transpõe porque surfarray usa (width, height, channels)
-    distorted_array_transposed = np.transpose(distorted_array, (1, 0, 2))
-    distorted = pygame.surfarray.make_surface(distorted_array_transposed)
-    
-    return distorted
-
-
+    distorted = source_surface.copy()
+    return DISTORTION.remap(source_surface, distorted, distortion_strength)
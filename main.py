@@ -1,225 +1,421 @@
 import pygame
 import sys
 import os
+import datetime
 import config
+import assets
 import graphics
+import postfx
 import ui
 import game_clock
 import map_system
+import quality
+from profiler import PROFILER
 
-# Inicialização
-pygame.init()
+DEFS = None
+DICT = None
+SCREEN = None
+OVERLAY_IMAGE = None
+GAME_CLOCK = None
+MAP_SYSTEM = None
+SPRITE_LOADER = None
+TV = None
+POSTFX = None
+UI_RENDERER = None
+TARGET = None
+PIPELINE = None
+GOVERNOR = None
+clock = None
+content_index = 0
+categories = []
 
-# Carrega Configuração
-DEFS, DICT = config.load_config()
+# Modo ocioso: sem entrada por IDLE_AFTER ms e nada animando, o loop dorme até
+# o próximo evento ou a próxima mudança agendada (segundo do relógio, piscada)
+IDLE_AFTER = 1000
+IDLE_MAX_WAIT = 1000
+last_activity = 0
 
-# Configura Tela
-SCREEN = pygame.display.set_mode((int(DEFS['width']), int(DEFS['height'])))
-if DEFS['fullscreen']:
-    pygame.display.set_mode((0, 0), pygame.FULLSCREEN)
+def init_app():
+    """Inicializa pygame, tela, assets e todos os sistemas do app"""
+    global DEFS, DICT, SCREEN, OVERLAY_IMAGE, GAME_CLOCK, MAP_SYSTEM, SPRITE_LOADER
+    global TV, POSTFX, UI_RENDERER, TARGET, GOVERNOR, clock, content_index, categories
 
-pygame.display.set_caption("Euphemeris")
+    # Inicialização
+    pygame.init()
 
-# Carrega assets
-SHEET = pygame.image.load("assets/spritesheet.png").convert_alpha()
-OVERLAY_IMAGE = pygame.image.load("assets/overlay.png").convert_alpha()
+    # Carrega Configuração
+    DEFS, DICT = config.load_config()
 
-# Inicializa sistemas
-GAME_CLOCK = game_clock.Glock()
-ui.init_ui_system(DEFS['width'], DEFS['height'], GAME_CLOCK)
-MAP_SYSTEM = map_system.RealMap(GAME_CLOCK)
-ui.set_map_system(MAP_SYSTEM)
-SPRITE_LOADER = graphics.init_graphics(SCREEN, SHEET, ui.PROPSYS, GAME_CLOCK)
+    # Configura Tela
+    SCREEN = pygame.display.set_mode((int(DEFS['width']), int(DEFS['height'])))
+    if DEFS['fullscreen']:
+        SCREEN = pygame.display.set_mode((0, 0), pygame.FULLSCREEN)
 
-clock = pygame.time.Clock()
-global TV
-TV = graphics.TeeVee()
-ui.set_tv(TV)
+    pygame.display.set_caption("Euphemeris")
 
-# Saudação inicial baseada no horário
-import datetime
-hour = datetime.datetime.now().hour
-if 5 <= hour < 12:
-    greeting = "Olá, bom dia!"
-elif 12 <= hour < 18:
-    greeting = "Olá, boa tarde!"
-else:
-    greeting = "Olá, boa noite!"
-
-ui.chat_response = greeting  # Exibe no chat
-TV.start_talking(greeting)   # TeeVee fala
-
-crt = graphics.apply_crt_effect()
-buttons = ui.clickable_elements()
-
-running = True
-content_index = config.getVars('content_index')
-categories = list(DICT['contentvals'].keys())
-
-while running:
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            running = False
-        elif event.type == pygame.MOUSEMOTION:
-            for button in buttons:
-                button.check_hover(event.pos)
-        elif event.type == pygame.MOUSEBUTTONDOWN:
-            for button in buttons:
-                if button.is_clicked(event.pos, event):
-                    
-                    # Divide nome do botão
-                    parts = button.name.split("_")
-                    if parts[0] == "nav":
-                        if parts[1] == "next":
-                            content_index = (content_index + 1) % len(categories)
-                        else:
-                            content_index = (content_index - 1) % len(categories)
-                        config.setVars('content_index', content_index)
-                        element = ui.searchElement(ui.user_interface['content_panel'], categories[content_index])
-                        for name, sibling in element.parent.subelements.items():
-                            sibling.visible = False
-                        element.visible = True
-                        buttons = ui.clickable_elements()
-                        
-                    elif parts[0] == "music":
-                        if parts[1] == "pause":
-                            if GAME_CLOCK.player.is_playing:
-                                GAME_CLOCK.player.pause()
-                                button.text="!SPRITE_play"
-                            else:
-                                GAME_CLOCK.player.play()
-                                button.text="!SPRITE_pause"
-                        elif parts[1] == "next":
-                            GAME_CLOCK.player.skip_music(dir=1)
-                        elif parts[1] == "prev":
-                            GAME_CLOCK.player.skip_music(dir=-1)
-                        elif parts[1] == "queue":
-                            GAME_CLOCK.player.randomize_queue()
-                            
-                    elif parts[0] == "zoom":
-                        if parts[1] == "in":
-                            MAP_SYSTEM.map_manager.zoom_in()
-                        else:
-                            MAP_SYSTEM.map_manager.zoom_out()
-                        config.setVars('zoom', MAP_SYSTEM.map_manager.current_zoom)
-                        
-                    elif parts[0] == "volume":
-                        if parts[1] == "up":
-                            GAME_CLOCK.player.volume_change(1)
-                        else:
-                            GAME_CLOCK.player.volume_change(-1)
-                            
-                    elif parts[0] == "config":
-                        # Handler para botões de configuração
-                        setting_name = parts[1]  # fullscreen, crt, scanlines, distortion, overlay
-                        config.toggle_setting(setting_name)
-                        # Recarrega DEFS (config.load_config() já atualiza config.DEFS)
-                        # Atualiza a tela se necessário
-                        if setting_name == "fullscreen":
-                            if config.DEFS['fullscreen']:
-                                SCREEN = pygame.display.set_mode((0, 0), pygame.FULLSCREEN)
-                            else:
-                                SCREEN = pygame.display.set_mode((int(config.DEFS['width']), int(config.DEFS['height'])))
-                                
-                    elif parts[0] == "chat":
-                        if parts[1] == "send":
-                            # Envia mensagem para Ollama processar
-                            if ui.chat_input.strip():
-                                # Remove resposta antiga se existir
-                                if os.path.exists('response.txt'):
-                                    os.remove('response.txt')
-                                
-                                # Escreve input para arquivo
-                                with open('input.txt', 'w', encoding='utf-8') as f:
-                                    f.write(ui.chat_input)
-                                
-                                ui.chat_input = ""
-                                ui.waiting_for_response = True
-                        elif parts[1] == "input":
-                            # Ativa o campo de input
-                            ui.chat_input_active = True
-                            
-                    elif parts[0] == "response":
-                        # Navegação entre páginas da resposta
-                        if parts[1] == "prev" and ui.current_page > 0:
-                            ui.current_page -= 1
-                            ui.chat_response = ui.response_pages[ui.current_page]
-                            TV.start_talking(ui.chat_response)
-                        elif parts[1] == "next" and ui.current_page < len(ui.response_pages) - 1:
-                            ui.current_page += 1
-                            ui.chat_response = ui.response_pages[ui.current_page]
-                            TV.start_talking(ui.chat_response)
-                    print(f"Clicou no botão: {button.name}")
-        elif event.type == pygame.KEYDOWN:
-            if event.key == pygame.K_ESCAPE:
-                running = False
-            elif ui.chat_input_active:
-                # Captura texto quando campo está ativo
-                if event.key == pygame.K_RETURN:
-                    # Enter envia mensagem
-                    if ui.chat_input.strip():
-                        # Remove resposta antiga se existir
-                        if os.path.exists('response.txt'):
-                            os.remove('response.txt')
-                        
-                        # Escreve input para arquivo
-                        with open('input.txt', 'w', encoding='utf-8') as f:
-                            f.write(ui.chat_input)
-                        TV.mouth="mouth_skeptic"
-                        ui.chat_input = ""
-                        ui.waiting_for_response = True
-                    ui.chat_input_active = False
-                elif event.key == pygame.K_BACKSPACE:
-                    ui.chat_input = ui.chat_input[:-1]
-                elif event.key == pygame.K_ESCAPE:
-                    ui.chat_input_active = False
-        elif event.type == pygame.TEXTINPUT and ui.chat_input_active:
-            # Adiciona caractere digitado
-            ui.chat_input += event.text
-    
-    # Verifica se há resposta do Ollama
+    # Carrega assets
+    SHEET = assets.load_image("assets/spritesheet.png")
+    OVERLAY_IMAGE = assets.load_image("assets/overlay.png")
+
+    # Superfície de desenho: a janela ou a resolução interna (dwidth x dheight)
+    TARGET = postfx.RenderTarget(
+        SCREEN,
+        (int(DEFS['width']), int(DEFS['height'])),
+        internal_size=internal_resolution() if DEFS.get('internal_resolution', False) else None,
+        integer_scaling=DEFS.get('integer_scaling', False)
+    )
+
+    # Inicializa sistemas
+    GAME_CLOCK = game_clock.Glock()
+    ui.init_ui_system(*TARGET.render_size, GAME_CLOCK)
+    MAP_SYSTEM = map_system.RealMap(GAME_CLOCK)
+    ui.set_map_system(MAP_SYSTEM)
+    SPRITE_LOADER = graphics.init_graphics(TARGET.surface, SHEET, ui.PROPSYS, GAME_CLOCK)
+
+    clock = pygame.time.Clock()
+    TV = graphics.TeeVee()
+    ui.set_tv(TV)
+
+    POSTFX = postfx.PostProcessor(OVERLAY_IMAGE, distortion_strength=0.05)
+    UI_RENDERER = ui.DirtyRenderer()
+    set_pipeline(DEFS.get('pipeline', False))
+
+    # Qualidade adaptativa (-1 = automática; o painel CONFIG pode fixar um nível)
+    GOVERNOR = quality.QualityGovernor()
+    # Instalações antigas não têm quality em [VARIABLES]: começa no automático
+    GOVERNOR.set_override(config.definitions.getint('VARIABLES', 'quality', fallback=quality.AUTO))
+    ui.set_governor(GOVERNOR)
+    apply_quality()
+
+    content_index = config.getVars('content_index')
+    categories = list(DICT['contentvals'].keys())
+
+    # Instrumentação por estágio (F3 liga/desliga o HUD, F4 salva o trace)
+    PROFILER.enabled = PROFILER.hud_visible = DEFS.get('profiler', False)
+
+def internal_resolution():
+    """Resolução interna configurada em [SCREEN]"""
+    return (int(DEFS['dwidth']), int(DEFS['dheight']))
+
+def set_internal_resolution(enabled):
+    """Liga/desliga o desenho na resolução interna, reconstruindo a UI no novo tamanho"""
+    if PIPELINE:
+        PIPELINE.wait()
+    TARGET.set_internal_size(internal_resolution() if enabled else None)
+    if TARGET.render_size != (ui.PROPSYS.screen_width, ui.PROPSYS.screen_height):
+        ui.resize_ui(*TARGET.render_size)
+    graphics.set_screen(TARGET.surface, ui.PROPSYS)
+    TV.resize()
+    UI_RENDERER.invalidate()
+
+def set_pipeline(enabled):
+    """Liga/desliga o pipeline (pós-processamento numa thread, um quadro atrás da UI)"""
+    global PIPELINE
+    if PIPELINE:
+        PIPELINE.close()
+        PIPELINE = None
+    TARGET.set_buffers(2 if enabled else 1)
+    if enabled:
+        PIPELINE = postfx.FramePipeline(POSTFX, TARGET, ui.font)
+    graphics.set_screen(TARGET.surface, ui.PROPSYS)
+    UI_RENDERER.invalidate()
+
+def apply_quality():
+    """Aplica o nível de qualidade atual nos efeitos e na resolução de desenho"""
+    strength_scale, scanlines, overlay, internal = GOVERNOR.settings()
+    POSTFX.set_quality(strength_scale, scanlines, overlay)
+    internal = internal or DEFS.get('internal_resolution', False)
+    if internal != (TARGET.internal_size is not None):
+        set_internal_resolution(internal)
+    UI_RENDERER.invalidate()
+
+def greet():
+    """Saudação inicial baseada no horário"""
+    hour = datetime.datetime.now().hour
+    if 5 <= hour < 12:
+        greeting = "Olá, bom dia!"
+    elif 12 <= hour < 18:
+        greeting = "Olá, boa tarde!"
+    else:
+        greeting = "Olá, boa noite!"
+
+    ui.chat_response = greeting  # Exibe no chat
+    TV.start_talking(greeting)   # TeeVee fala
+
+def show_panel(index, persist=True):
+    """Mostra o painel de conteúdo de índice index e esconde os demais"""
+    global content_index
+    content_index = index % len(categories)
+    if persist:
+        config.setVars('content_index', content_index)
+    else:
+        config.definitions.set('VARIABLES', 'content_index', str(content_index))
+    ui.show_content(categories[content_index])
+
+def send_chat_message():
+    """Envia a mensagem digitada para o Ollama processar"""
+    # Remove resposta antiga se existir
+    if os.path.exists('response.txt'):
+        os.remove('response.txt')
+
+    # Escreve input para arquivo
+    with open('input.txt', 'w', encoding='utf-8') as f:
+        f.write(ui.chat_input)
+
+    ui.chat_input = ""
+    ui.waiting_for_response = True
+
+def handle_click(button):
+    """Executa a ação do botão clicado"""
+    global SCREEN
+
+    # Divide nome do botão
+    parts = button.name.split("_")
+    if parts[0] == "nav":
+        if parts[1] == "next":
+            show_panel(content_index + 1)
+        else:
+            show_panel(content_index - 1)
+
+    elif parts[0] == "music":
+        if parts[1] == "pause":
+            # O ícone (!music_toggle) acompanha is_playing ao ser desenhado
+            if GAME_CLOCK.player.is_playing:
+                GAME_CLOCK.player.pause()
+            else:
+                GAME_CLOCK.player.play()
+        elif parts[1] == "next":
+            GAME_CLOCK.player.skip_music(dir=1)
+        elif parts[1] == "prev":
+            GAME_CLOCK.player.skip_music(dir=-1)
+        elif parts[1] == "queue":
+            GAME_CLOCK.player.randomize_queue()
+
+    elif parts[0] == "zoom":
+        if parts[1] == "in":
+            MAP_SYSTEM.map_manager.zoom_in()
+        else:
+            MAP_SYSTEM.map_manager.zoom_out()
+        config.setVars('zoom', MAP_SYSTEM.map_manager.current_zoom)
+
+    elif parts[0] == "volume":
+        if parts[1] == "up":
+            GAME_CLOCK.player.volume_change(1)
+        else:
+            GAME_CLOCK.player.volume_change(-1)
+
+    elif parts[0] == "config":
+        # Handler para botões de configuração
+        setting_name = parts[1]  # fullscreen, crt, scanlines, distortion, overlay
+        config.toggle_setting(setting_name)
+        # Recarrega DEFS (config.load_config() já atualiza config.DEFS)
+        # Atualiza a tela se necessário
+        if setting_name == "fullscreen":
+            if PIPELINE:
+                PIPELINE.wait()
+            if config.DEFS['fullscreen']:
+                SCREEN = pygame.display.set_mode((0, 0), pygame.FULLSCREEN)
+            else:
+                SCREEN = pygame.display.set_mode((int(config.DEFS['width']), int(config.DEFS['height'])))
+            TARGET.set_window(SCREEN)
+            graphics.set_screen(TARGET.surface, ui.PROPSYS)
+        UI_RENDERER.invalidate()
+
+    elif parts[0] == "quality":
+        # Alterna entre automático e os níveis fixos
+        config.setVars('quality', GOVERNOR.cycle_override())
+        apply_quality()
+
+    elif parts[0] == "chat":
+        if parts[1] == "send":
+            # Envia mensagem para Ollama processar
+            if ui.chat_input.strip():
+                send_chat_message()
+        elif parts[1] == "input":
+            # Ativa o campo de input
+            ui.chat_input_active = True
+
+    elif parts[0] == "response":
+        # Navegação entre páginas da resposta
+        if parts[1] == "prev" and ui.current_page > 0:
+            ui.current_page -= 1
+            ui.chat_response = ui.response_pages[ui.current_page]
+            TV.start_talking(ui.chat_response)
+        elif parts[1] == "next" and ui.current_page < len(ui.response_pages) - 1:
+            ui.current_page += 1
+            ui.chat_response = ui.response_pages[ui.current_page]
+            TV.start_talking(ui.chat_response)
+    print(f"Clicou no botão: {button.name}")
+
+def handle_event(event):
+    """Trata um evento; retorna False quando o app deve encerrar"""
+    if event.type == pygame.QUIT:
+        return False
+    elif event.type == pygame.MOUSEMOTION:
+        pos = TARGET.window_to_render(event.pos)
+        TV.track_mouse(pos)
+        ui.HIT_GRID.hover(pos)
+    elif event.type == ui.UI_HOVER:
+        event.element.set_hover(event.hovering)
+    elif event.type == pygame.MOUSEBUTTONDOWN:
+        pos = TARGET.window_to_render(event.pos)
+        for button in ui.HIT_GRID.query(pos):
+            if button.is_clicked(pos, event):
+                handle_click(button)
+    elif event.type == pygame.KEYDOWN:
+        if event.key == pygame.K_ESCAPE:
+            return False
+        elif event.key == pygame.K_F3:
+            PROFILER.toggle()
+            UI_RENDERER.invalidate()
+        elif event.key == pygame.K_F4:
+            PROFILER.dump()
+        elif ui.chat_input_active:
+            # Captura texto quando campo está ativo
+            if event.key == pygame.K_RETURN:
+                # Enter envia mensagem
+                if ui.chat_input.strip():
+                    send_chat_message()
+                    TV.mouth="mouth_skeptic"
+                ui.chat_input_active = False
+            elif event.key == pygame.K_BACKSPACE:
+                ui.chat_input = ui.chat_input[:-1]
+            elif event.key == pygame.K_ESCAPE:
+                ui.chat_input_active = False
+    elif event.type == pygame.TEXTINPUT and ui.chat_input_active:
+        # Adiciona caractere digitado
+        ui.chat_input += event.text
+    return True
+
+def poll_chat_response():
+    """Verifica se há resposta do Ollama"""
     if ui.waiting_for_response and os.path.exists('response.txt'):
         try:
             with open('response.txt', 'r', encoding='utf-8') as f:
                 full_response = f.read().strip()
-            
+
             # Divide resposta em páginas
-            ui.response_pages = ui.split_response_into_pages(full_response, ui.max_chars_per_page)
+            ui.response_pages = ui.paginate_response(full_response)
             ui.current_page = 0
             ui.chat_response = ui.response_pages[0] if ui.response_pages else ""
-            
+
             # Inicia animação de fala
             TV.start_talking(ui.chat_response)
-            
+
             # Remove arquivo de resposta
             os.remove('response.txt')
             ui.waiting_for_response = False
         except Exception as e:
             print(f"Erro ao ler resposta: {e}")
-    
-    # Limpa a tela
-    SCREEN.fill(DEFS['bg'])
-    
-    userint = ui.render_ui(SCREEN)   
+
+def is_idle(now):
+    """True se nada na tela depende de quadros seguidos"""
+    if not DEFS.get('idle', True) or now - last_activity < IDLE_AFTER:
+        return False
+    # Quadro anterior mudou alguma fonte de dados ou redesenhou algo: o
+    # próximo também pode mudar
+    if UI_RENDERER.changed:
+        return False
+    # Barra de progresso na tela com música tocando avança a cada quadro,
+    # mesmo quando o último quadro não chegou a mover um pixel
+    if UI_RENDERER.animating and GAME_CLOCK.player.is_playing:
+        return False
+    return not (TV.is_talking or TV.is_dizzy or ui.waiting_for_response
+                or MAP_SYSTEM.map_manager.is_loading)
+
+def next_update_delay(now):
+    """Milissegundos até a próxima mudança agendada na tela"""
+    delays = [
+        1000 - datetime.datetime.now().microsecond // 1000,  # Próximo segundo do relógio
+        TV.next_change(now),
+        IDLE_MAX_WAIT,
+    ]
+    if ui.chat_input_active:
+        delays.append(500 - (now - ui.chat_cursor_timer))  # Cursor piscante
+    return max(1, min(delays))
+
+def wait_idle(now):
+    """
+    Dorme até um evento chegar ou a próxima atualização agendada
+
+    Returns:
+        O evento que acordou o loop (já fora da fila), ou None
+    """
+    if PIPELINE:
+        PIPELINE.wait()  # O último quadro precisa estar na tela antes de dormir
+    event = pygame.event.wait(next_update_delay(now))
+    return event if event.type != pygame.NOEVENT else None
+
+def render_frame():
+    """Desenha, atualiza e apresenta um quadro"""
+    # Relógio antes da UI: o quadro já desenha (e registra como mudança) o
+    # valor novo, em vez de só percebê-lo no quadro seguinte
     GAME_CLOCK.update()
+    PROFILER.lap("clock")
+    # Desenha a UI (só as áreas alteradas quando não há efeito de tela cheia)
+    surface = TARGET.surface
+    # Com pipeline os buffers se alternam, então o quadro é sempre completo
+    full = PIPELINE is not None or POSTFX.is_active() or PROFILER.hud_visible
+    dirty_rects = UI_RENDERER.render(surface, full=full)
+    PROFILER.lap("ui")
     TV.update()  # Atualiza animação de fala do TeeVee
-    # Desenha a TV    
-    if DEFS['crt']:
-            SCREEN.blit(crt, (0, 0))    
-    # Escala overlay (convertendo para int por segurança)
-    if DEFS['overlay']:   
-        OVERLAY_SCALED = pygame.transform.scale(OVERLAY_IMAGE, (int(DEFS['width']), int(DEFS['height'])))
-        SCREEN.blit(OVERLAY_SCALED, (0, 0))
-    # Aplica barrel distortion (efeito CRT final)
-    if DEFS['distortion']:
-        distorted_screen = graphics.apply_barrel_distortion(SCREEN, distortion_strength=0.05)
-        SCREEN.blit(distorted_screen, (0, 0))
-    if DEFS['scanlines']:
-        scanlines = graphics.apply_scanlines(SCREEN, SCREEN.get_rect(), 2, 40, pygame.time.get_ticks() / 50)
-        SCREEN.blit(scanlines, (0, 0))
-    # Atualiza a tela
-    pygame.display.flip()
-    clock.tick(60)
-
-pygame.quit()
-sys.exit()
\ No newline at end of file
+    PROFILER.lap("tv")
+    if PIPELINE:
+        # Efeitos e apresentação deste quadro rodam enquanto o próximo é desenhado
+        PIPELINE.submit(surface, pygame.time.get_ticks())
+        graphics.set_screen(TARGET.swap(), ui.PROPSYS)
+        PROFILER.lap("pipeline")
+        return
+    # Efeitos CRT (textura, overlay, distorção e scanlines) em um único estágio
+    POSTFX.apply(surface, pygame.time.get_ticks())
+    PROFILER.draw_hud(surface, ui.font)
+    # Escala para a janela (resolução interna) e atualiza a tela
+    TARGET.present(dirty_rects)
+    PROFILER.lap("present")
+
+def main():
+    global last_activity
+    init_app()
+    greet()
+
+    running = True
+    slept = False
+    woke = []  # Evento que acordou o loop; vem antes dos que chegaram depois
+    while running:
+        PROFILER.start_frame()
+        events = woke + pygame.event.get()
+        woke = []
+        if events:
+            last_activity = pygame.time.get_ticks()
+        for event in events:
+            if not handle_event(event):
+                running = False
+        PROFILER.lap("events")
+        poll_chat_response()
+        PROFILER.lap("chat")
+        render_frame()
+        clock.tick(60)
+        PROFILER.lap("tick")
+        # Tempo de trabalho do quadro, sem a espera do tick (um quadro depois
+        # de dormir inclui o sono e não conta)
+        if not slept and GOVERNOR.update(clock.get_rawtime()):
+            apply_quality()
+        now = pygame.time.get_ticks()
+        slept = running and is_idle(now)
+        if slept:
+            event = wait_idle(now)
+            if event is not None:
+                woke.append(event)
+            PROFILER.lap("idle")
+        PROFILER.end_frame()
+
+    if PROFILER.enabled:
+        PROFILER.dump()
+
+    set_pipeline(False)
+    POSTFX.close()
+    pygame.quit()
+    sys.exit()
+
+if __name__ == "__main__":
+    main()
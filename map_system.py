@@ -4,6 +4,7 @@ import requests
 from io import BytesIO
 import threading
 from config import DEFS, getVars
+import assets
 
 # Configurações do mapa (Valores padrão fixos já que config.ini está faltando)
 MAP_CONFIG = {
@@ -42,7 +43,7 @@ class RobustMap:
                     if response.status_code == 200:
                         try:
                             image_file = BytesIO(response.content)
-                            tile_surface = pygame.image.load(image_file).convert()
+                            tile_surface = assets.load_image(image_file, alpha=False)
                             self.cache[cache_key] = tile_surface
                             return tile_surface
                         except pygame.error:
@@ -252,7 +253,8 @@ class MapManager:
         # Aplica máscara
         new_surface.blit(mask, (0, 0), special_flags=pygame.BLEND_RGBA_MIN)
         
-        return new_surface
+        # Mapa fica pronto para blit no formato da tela
+        return assets.prepare(new_surface)
 
 class RealMap:
     def __init__(self, game_clock, content_area_rect=None):
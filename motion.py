@@ -0,0 +1,109 @@
+import numpy as np
+
+class MotionTracker:
+    """
+    Movimento recente do mouse num buffer circular de tamanho fixo
+
+    Alimentado pelos eventos MOUSEMOTION. Cada amostra guarda a posição, o
+    instante, a distância (Manhattan) desde a amostra anterior e se o passo
+    inverteu a direção do passo anterior. A distância total e o número de
+    inversões dentro da janela são somas correntes: entram quando a amostra
+    chega e saem quando ela expira, sem percorrer o histórico.
+    """
+    def __init__(self, capacity=256, window_ms=1000):
+        self.capacity = capacity
+        self.window_ms = window_ms
+        self.x = np.zeros(capacity, dtype=np.int32)
+        self.y = np.zeros(capacity, dtype=np.int32)
+        self.t = np.zeros(capacity, dtype=np.int64)
+        self.step = np.zeros(capacity, dtype=np.int32)    # Distância desde a amostra anterior
+        self.sign_x = np.zeros(capacity, dtype=np.int8)   # Direção do passo (-1, 0, 1)
+        self.sign_y = np.zeros(capacity, dtype=np.int8)
+        self.turn = np.zeros(capacity, dtype=np.int8)     # 1 se o passo inverteu a direção
+        self.start = 0   # Índice da amostra mais antiga
+        self.count = 0
+        self.distance = 0           # Soma dos passos dentro da janela
+        self.direction_changes = 0  # Inversões dentro da janela
+        self.position = None        # Última posição conhecida (sobrevive à expiração)
+
+    def _index(self, offset):
+        return (self.start + offset) % self.capacity
+
+    def add(self, pos, ticks):
+        """Registra uma posição do mouse no instante ticks (ms)"""
+        self.expire(ticks)
+        if self.count == self.capacity:
+            self._drop_oldest()
+
+        x, y = int(pos[0]), int(pos[1])
+        step = sign_x = sign_y = turn = 0
+        if self.count:
+            last = self._index(self.count - 1)
+            dx = x - int(self.x[last])
+            dy = y - int(self.y[last])
+            step = abs(dx) + abs(dy)
+            sign_x = (dx > 0) - (dx < 0)
+            sign_y = (dy > 0) - (dy < 0)
+            # Só compara com um passo que ainda está na janela
+            if self.count > 1 and (sign_x * self.sign_x[last] < 0 or sign_y * self.sign_y[last] < 0):
+                turn = 1
+
+        i = self._index(self.count)
+        self.x[i] = x
+        self.y[i] = y
+        self.t[i] = ticks
+        self.step[i] = step
+        self.sign_x[i] = sign_x
+        self.sign_y[i] = sign_y
+        self.turn[i] = turn
+        self.count += 1
+        self.distance += step
+        self.direction_changes += turn
+        self.position = (x, y)
+
+    def _drop_oldest(self):
+        self.start = self._index(1)
+        self.count -= 1
+        # O passo que chegava na nova primeira amostra saiu da janela, e com
+        # ele a inversão medida pela amostra seguinte
+        if self.count:
+            self.distance -= int(self.step[self.start])
+        if self.count > 1:
+            self.direction_changes -= int(self.turn[self._index(1)])
+
+    def expire(self, ticks):
+        """Descarta amostras mais antigas que a janela"""
+        while self.count and ticks - self.t[self.start] >= self.window_ms:
+            self._drop_oldest()
+
+    def clear(self):
+        """Esvazia a janela (a última posição é mantida)"""
+        self.start = 0
+        self.count = 0
+        self.distance = 0
+        self.direction_changes = 0
+
+    def span(self):
+        """Tempo entre a amostra mais antiga e a mais recente, em ms"""
+        if self.count < 2:
+            return 0
+        return int(self.t[self._index(self.count - 1)] - self.t[self.start])
+
+    def speed(self):
+        """Velocidade média ao longo do caminho, em px/s"""
+        span = self.span()
+        return self.distance * 1000.0 / span if span else 0.0
+
+    def velocity(self):
+        """Deslocamento líquido por segundo na janela: (vx, vy) em px/s"""
+        span = self.span()
+        if not span:
+            return (0.0, 0.0)
+        last = self._index(self.count - 1)
+        return ((int(self.x[last]) - int(self.x[self.start])) * 1000.0 / span,
+                (int(self.y[last]) - int(self.y[self.start])) * 1000.0 / span)
+
+    def direction_change_rate(self):
+        """Inversões de direção por segundo na janela"""
+        span = self.span()
+        return self.direction_changes * 1000.0 / span if span else 0.0
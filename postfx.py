@@ -0,0 +1,314 @@
+import pygame
+from concurrent.futures import ThreadPoolExecutor
+import graphics
+import assets
+from config import DEFS
+from profiler import PROFILER
+
+# Parâmetros das linhas de varredura (mesmos do efeito original)
+SCANLINE_SPACING = 2
+SCANLINE_INTENSITY = 40
+SCANLINE_SPEED = 50  # Milissegundos por passo da animação
+
+class TextureCache:
+    """
+    Camadas de tela cheia prontas para blit: textura CRT, overlay escalado e
+    as variantes de fase das scanlines
+
+    São construídas uma vez por resolução e descartadas apenas quando o
+    tamanho da tela ou o crtsize mudam.
+    """
+    def __init__(self, overlay_image):
+        self.overlay_image = overlay_image
+        self.key = None
+        self.layers = {}
+
+    def _get(self, size, name, builder):
+        key = (tuple(size), int(DEFS['crtsize']))
+        if key != self.key:
+            self.layers.clear()
+            self.key = key
+        layer = self.layers.get(name)
+        if layer is None:
+            layer = builder(size)
+            self.layers[name] = layer
+        return layer
+
+    def crt(self, size):
+        """Grade da textura CRT"""
+        return self._get(size, "crt", lambda size: assets.prepare(graphics.build_crt_texture(size, DEFS['crtsize'])))
+
+    def overlay(self, size):
+        """Overlay escalado para a tela"""
+        return self._get(size, "overlay", lambda size: assets.prepare(pygame.transform.scale(self.overlay_image, size)))
+
+    def scanlines(self, size, spacing, intensity, phase):
+        """Máscara opaca das scanlines para BLEND_MULT, uma por fase"""
+        return self._get(size, ("scanlines", spacing, intensity, phase),
+                         lambda size: self._build_scanlines(size, spacing, intensity, phase))
+
+    def _build_scanlines(self, size, spacing, intensity, phase):
+        width, height = size
+        factor = (256 * (255 - intensity) + 127) // 255 - 1
+        mask = pygame.Surface(size)
+        mask.fill((255, 255, 255))
+        for y in range(phase, height, spacing):
+            mask.fill((factor, factor, factor), (0, y, width, 1))
+        return mask
+
+    def clear(self):
+        self.layers.clear()
+        self.key = None
+
+class PostProcessor:
+    """
+    Pós-processamento CRT em um único estágio
+
+    Aplica textura CRT, overlay, distorção de barril e scanlines conforme os
+    toggles de [TOGGLE], escrevendo direto na superfície da tela. A distorção
+    é feita sobre a visão pixels2d da própria tela e já embute as scanlines,
+    então não há cópias temporárias do quadro inteiro. As demais camadas vêm
+    prontas do TextureCache.
+
+    Com postfx_workers > 1 em [SCREEN], a distorção é dividida em faixas
+    horizontais processadas por um pool de threads.
+    """
+    def __init__(self, overlay_image, distortion_strength=0.05):
+        self.textures = TextureCache(overlay_image)
+        self.distortion_strength = distortion_strength
+        self.workers = 1
+        self.pool = None
+        # Limites do QualityGovernor, aplicados por cima dos toggles
+        self.strength_scale = 1.0
+        self.suppressed = set()
+
+    def enabled(self, effect):
+        """True se o efeito está ligado em [TOGGLE] e não foi cortado pela qualidade"""
+        return DEFS[effect] and effect not in self.suppressed
+
+    def set_quality(self, strength_scale, scanlines=True, overlay=True):
+        """Aplica os limites de um nível de qualidade"""
+        self.strength_scale = strength_scale
+        self.suppressed = {effect for effect, on in (("distortion", strength_scale > 0),
+                                                     ("scanlines", scanlines),
+                                                     ("overlay", overlay)) if not on}
+
+    def get_pool(self):
+        """Pool de threads para as faixas, recriado se postfx_workers mudar"""
+        workers = max(1, int(DEFS.get('postfx_workers', 1)))
+        if workers != self.workers:
+            self.close()
+            self.workers = workers
+        if self.workers > 1 and self.pool is None:
+            self.pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="postfx")
+        return self.pool
+
+    def close(self):
+        """Encerra o pool de threads"""
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+
+    def is_active(self):
+        """True se algum efeito de tela cheia está ligado"""
+        return any(self.enabled(effect) for effect in ("crt", "overlay", "distortion", "scanlines"))
+
+    def apply(self, surface, ticks):
+        """Aplica os efeitos ativos em surface, no próprio lugar"""
+        size = surface.get_size()
+
+        if self.enabled('crt'):
+            assets.blit(surface, self.textures.crt(size), (0, 0))
+            PROFILER.lap("fx_crt")
+        if self.enabled('overlay'):
+            assets.blit(surface, self.textures.overlay(size), (0, 0))
+            PROFILER.lap("fx_overlay")
+
+        scanlines = None
+        if self.enabled('scanlines'):
+            phase = int(ticks / SCANLINE_SPEED) % SCANLINE_SPACING
+            scanlines = (SCANLINE_SPACING, SCANLINE_INTENSITY, phase)
+
+        if self.enabled('distortion'):
+            strength = self.distortion_strength * self.strength_scale
+            graphics.DISTORTION.remap(surface, surface, strength, scanlines,
+                                      pool=self.get_pool(), bands=self.workers)
+            PROFILER.lap("fx_distortion")
+        elif scanlines:
+            spacing, intensity, phase = scanlines
+            mask = self.textures.scanlines(size, spacing, intensity, phase)
+            surface.blit(mask, (0, 0), special_flags=pygame.BLEND_MULT)
+            PROFILER.lap("fx_scanlines")
+        return surface
+
+class RenderTarget:
+    """
+    Superfície onde UI, TeeVee e pós-processamento desenham
+
+    Sem resolução interna é a própria janela. Com ela, é uma superfície
+    offscreen de tamanho fixo (dwidth x dheight) que é escalada para a janela
+    uma vez por quadro: por um fator inteiro centralizado (integer_scaling) ou
+    suavizada ocupando a janela inteira. Com buffers=2 (pipeline) há duas
+    superfícies offscreen que se alternam a cada quadro.
+    """
+    def __init__(self, window, size, internal_size=None, integer_scaling=False, buffers=1):
+        self.window = window
+        self.size = tuple(size)  # Resolução de desenho sem resolução interna
+        self.integer_scaling = integer_scaling
+        self.internal_size = tuple(internal_size) if internal_size else None
+        self.buffer_count = buffers
+        self.buffers = []
+        self.surface = window
+        self.dest_rect = window.get_rect()
+        self._create_buffers()
+
+    @property
+    def render_size(self):
+        """Tamanho em que a UI deve ser construída"""
+        return self.internal_size or self.size
+
+    @property
+    def offscreen(self):
+        """True se o desenho não é feito direto na janela"""
+        return self.internal_size is not None or self.buffer_count > 1
+
+    def set_internal_size(self, internal_size):
+        """Liga (tamanho) ou desliga (None) a resolução interna"""
+        self.internal_size = tuple(internal_size) if internal_size else None
+        self._create_buffers()
+
+    def set_buffers(self, count):
+        """Usa count superfícies de desenho alternadas (2 para o pipeline)"""
+        self.buffer_count = count
+        self._create_buffers()
+
+    def _create_buffers(self):
+        if self.offscreen:
+            self.buffers = [pygame.Surface(self.render_size, 0, self.window)
+                            for _ in range(self.buffer_count)]
+            self.surface = self.buffers[0]
+        else:
+            self.buffers = []
+            self.surface = self.window
+        self.set_window(self.window)
+
+    def swap(self):
+        """Passa a desenhar na próxima superfície; retorna a nova superfície"""
+        if len(self.buffers) > 1:
+            index = (self.buffers.index(self.surface) + 1) % len(self.buffers)
+            self.surface = self.buffers[index]
+        return self.surface
+
+    def set_window(self, window):
+        """Atualiza a janela de destino (ex: após alternar tela cheia)"""
+        self.window = window
+        if not self.offscreen:
+            self.surface = window
+            self.dest_rect = window.get_rect()
+            return
+        window_rect = window.get_rect()
+        if not self.internal_size:
+            # Só o pipeline: cópia 1:1 no canto, como o desenho direto
+            self.dest_rect = pygame.Rect((0, 0), self.size)
+            return
+        width, height = self.internal_size
+        factor = min(window_rect.width // width, window_rect.height // height)
+        if self.integer_scaling and factor >= 1:
+            self.dest_rect = pygame.Rect(0, 0, width * factor, height * factor)
+            self.dest_rect.center = window_rect.center
+        else:
+            self.dest_rect = window_rect
+        # Bordas do letterbox ficam pretas; só a área de destino é redesenhada
+        window.fill((0, 0, 0))
+
+    def window_to_render(self, pos):
+        """Converte uma posição da janela (mouse) para coordenadas de desenho"""
+        if not self.internal_size:
+            return pos
+        width, height = self.internal_size
+        x = (pos[0] - self.dest_rect.x) * width // self.dest_rect.width
+        y = (pos[1] - self.dest_rect.y) * height // self.dest_rect.height
+        return (x, y)
+
+    def compose(self, surface, dirty_rects=None):
+        """
+        Copia/escala surface para a janela, sem atualizar a tela
+
+        Args:
+            surface: Superfície de desenho com o quadro pronto
+            dirty_rects: Retângulos alterados em coordenadas de desenho, ou None
+
+        Returns:
+            Retângulos da janela a atualizar, ou None para a tela inteira
+        """
+        if surface is self.window:
+            return dirty_rects
+
+        dest = self.dest_rect
+        if dest.size == surface.get_size():
+            self.window.blit(surface, dest)
+        elif self.integer_scaling and dirty_rects is not None:
+            # Escala inteira é exata por pixel: só as áreas alteradas
+            factor = dest.width // surface.get_width()
+            updated = []
+            for rect in dirty_rects:
+                target = pygame.Rect(dest.x + rect.x * factor, dest.y + rect.y * factor,
+                                     rect.width * factor, rect.height * factor)
+                pygame.transform.scale(surface.subsurface(rect), target.size,
+                                       self.window.subsurface(target))
+                updated.append(target)
+            return updated
+        elif self.integer_scaling:
+            pygame.transform.scale(surface, dest.size, self.window.subsurface(dest))
+        else:
+            pygame.transform.smoothscale(surface, dest.size, self.window.subsurface(dest))
+        return None
+
+    def flip(self, rects=None):
+        """Atualiza a tela (só rects, se informados)"""
+        if rects is None:
+            pygame.display.flip()
+        else:
+            pygame.display.update(rects)
+
+    def present(self, dirty_rects=None):
+        """Escala o quadro atual para a janela (se necessário) e atualiza a tela"""
+        self.flip(self.compose(self.surface, dirty_rects))
+
+class FramePipeline:
+    """
+    Pipeline de dois estágios: pós-processamento numa thread
+
+    Enquanto a thread aplica os efeitos no quadro N e o compõe na janela, a
+    thread principal desenha a UI do quadro N+1 no outro buffer do
+    RenderTarget. Custa um quadro de latência; como o NumPy libera o GIL na
+    distorção, os dois estágios se sobrepõem de fato.
+    """
+    def __init__(self, postprocessor, target, hud_font=None):
+        self.postprocessor = postprocessor
+        self.target = target
+        self.hud_font = hud_font
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pipeline")
+        self.pending = None
+
+    def _process(self, surface, ticks):
+        self.postprocessor.apply(surface, ticks)
+        PROFILER.draw_hud(surface, self.hud_font)
+        return self.target.compose(surface)
+
+    def wait(self):
+        """Espera o quadro em processamento e o mostra na tela"""
+        if self.pending is not None:
+            rects = self.pending.result()
+            self.pending = None
+            self.target.flip(rects)
+
+    def submit(self, surface, ticks):
+        """Mostra o quadro anterior e envia surface para o pós-processamento"""
+        self.wait()
+        self.pending = self.executor.submit(self._process, surface, ticks)
+
+    def close(self):
+        """Termina o quadro pendente e encerra a thread"""
+        self.wait()
+        self.executor.shutdown()
@@ -0,0 +1,142 @@
+import time
+import threading
+import json
+import csv
+import datetime
+import numpy as np
+import pygame
+from fonts import FONTS
+
+class FrameProfiler:
+    """
+    Instrumentação por estágio do loop principal
+
+    Cada estágio é medido por "voltas" (lap): o tempo desde a marca anterior
+    é gravado num buffer circular de tamanho fixo por estágio. Desligado, cada
+    chamada retorna logo na primeira linha. Só a thread principal mede; voltas
+    vindas de outras threads (pipeline) são ignoradas.
+    """
+    def __init__(self, capacity=600, enabled=False):
+        self.capacity = capacity
+        self.enabled = enabled
+        self.hud_visible = enabled
+        self.samples = {}  # estágio -> buffer circular em ms
+        self.frame = 0     # Quadros gravados (o índice circular é frame % capacity)
+        self.last_mark = 0.0
+        self.frame_start = 0.0
+        self.thread = threading.main_thread()
+
+    def toggle(self):
+        """Liga/desliga a medição junto com o HUD"""
+        self.enabled = not self.enabled
+        self.hud_visible = self.enabled
+        self.samples.clear()
+        self.frame = 0
+        # Começa a medir a partir deste ponto do quadro atual
+        self.frame_start = self.last_mark = time.perf_counter()
+        return self.enabled
+
+    def start_frame(self):
+        if not self.enabled:
+            return
+        self.frame_start = self.last_mark = time.perf_counter()
+
+    def lap(self, stage):
+        """Grava o tempo desde a última marca no estágio informado"""
+        if not self.enabled or threading.current_thread() is not self.thread:
+            return
+        now = time.perf_counter()
+        buffer = self.samples.get(stage)
+        if buffer is None:
+            buffer = self.samples[stage] = np.zeros(self.capacity, dtype=np.float32)
+        buffer[self.frame % self.capacity] += (now - self.last_mark) * 1000.0
+        self.last_mark = now
+
+    def end_frame(self):
+        if not self.enabled:
+            return
+        self.lap("other")
+        total_buffer = self.samples.get("total")
+        if total_buffer is None:
+            total_buffer = self.samples["total"] = np.zeros(self.capacity, dtype=np.float32)
+        total_buffer[self.frame % self.capacity] = (self.last_mark - self.frame_start) * 1000.0
+        self.frame += 1
+        # Zera a próxima posição de todos os estágios (lap acumula)
+        for buffer in self.samples.values():
+            buffer[self.frame % self.capacity] = 0.0
+
+    def _recorded(self, buffer):
+        count = min(self.frame, self.capacity)
+        if count < self.capacity:
+            return buffer[:count]
+        # Reordena do mais antigo para o mais recente
+        start = self.frame % self.capacity
+        return np.concatenate((buffer[start:], buffer[:start]))
+
+    def percentiles(self):
+        """Retorna {estágio: (p50, p95, p99)} em milissegundos"""
+        stats = {}
+        for stage, buffer in self.samples.items():
+            recorded = self._recorded(buffer)
+            if len(recorded):
+                p50, p95, p99 = np.percentile(recorded, (50, 95, 99))
+                stats[stage] = (float(p50), float(p95), float(p99))
+        return stats
+
+    def draw_hud(self, screen, font_file=None):
+        """Desenha a tabela p50/p95/p99 no canto da tela; retorna o retângulo usado"""
+        if not self.hud_visible:
+            return None
+        # Do registro compartilhado: entra no relatório de tamanhos carregados
+        hud_font = FONTS.get(font_file, 18)
+
+        lines = [f"{'stage':<12}{'p50':>7}{'p95':>7}{'p99':>7}"]
+        for stage, (p50, p95, p99) in self.percentiles().items():
+            lines.append(f"{stage:<12}{p50:7.2f}{p95:7.2f}{p99:7.2f}")
+
+        line_height = hud_font.get_linesize()
+        width = max(hud_font.size(line)[0] for line in lines) + 10
+        hud_rect = pygame.Rect(5, 5, width, line_height * len(lines) + 10)
+        screen.fill((0, 0, 0), hud_rect)
+        for i, line in enumerate(lines):
+            surface = hud_font.render(line, False, (0, 255, 0))
+            screen.blit(surface, (hud_rect.x + 5, hud_rect.y + 5 + i * line_height))
+        return hud_rect
+
+    def dump(self, path=None):
+        """
+        Salva o trace em CSV (um quadro por linha) e JSON (percentis + amostras)
+
+        Returns:
+            Caminho base dos arquivos gravados, ou None se não há amostras
+        """
+        if not self.samples or self.frame == 0:
+            return None
+        if path is None:
+            path = datetime.datetime.now().strftime("frame_trace_%Y%m%d_%H%M%S")
+
+        stages = list(self.samples.keys())
+        recorded = {stage: self._recorded(self.samples[stage]) for stage in stages}
+        count = min(self.frame, self.capacity)
+
+        with open(path + ".csv", "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["frame"] + stages)
+            first_frame = self.frame - count
+            for i in range(count):
+                writer.writerow([first_frame + i] + [f"{recorded[stage][i]:.3f}" for stage in stages])
+
+        with open(path + ".json", "w") as f:
+            json.dump({
+                "frames": count,
+                "percentiles_ms": {
+                    stage: dict(zip(("p50", "p95", "p99"), values))
+                    for stage, values in self.percentiles().items()
+                },
+                "samples_ms": {stage: [round(float(v), 3) for v in recorded[stage]] for stage in stages},
+            }, f, indent=2)
+
+        print(f"Trace de quadros salvo em {path}.csv / {path}.json")
+        return path
+
+PROFILER = FrameProfiler()
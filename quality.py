@@ -0,0 +1,97 @@
+from collections import deque
+
+# Níveis de qualidade, do mais alto para o mais baixo. Cada passo para baixo
+# corta um efeito na ordem: força da distorção, scanlines, overlay e, por
+# último, a resolução de desenho.
+# (força relativa da distorção, scanlines, overlay, resolução interna)
+QUALITY_LEVELS = (
+    (1.0, True, True, False),
+    (0.5, True, True, False),
+    (0.0, True, True, False),
+    (0.0, False, True, False),
+    (0.0, False, False, False),
+    (0.0, False, False, True),
+)
+AUTO = -1
+
+class QualityGovernor:
+    """
+    Ajusta a qualidade dos efeitos pelo tempo de quadro
+
+    Guarda uma janela dos tempos de trabalho de cada quadro (sem a espera do
+    clock.tick). Se a média passa do orçamento, desce um nível; se sobra folga,
+    sobe um. Para não oscilar, cada troca esvazia a janela e, quando um nível
+    já falhou, a volta para ele espera o dobro do tempo da vez anterior.
+    """
+    def __init__(self, budget_ms=1000 / 60, window=60, down_ratio=1.05, up_ratio=0.6, cooldown=120):
+        self.budget_ms = budget_ms
+        self.samples = deque(maxlen=window)
+        self.down_ratio = down_ratio  # Acima de budget * down_ratio desce
+        self.up_ratio = up_ratio      # Abaixo de budget * up_ratio sobe
+        self.cooldown = cooldown      # Quadros mínimos entre trocas
+        self.level = 0                # Passos abaixo da qualidade máxima
+        self.override = AUTO          # Nível fixo escolhido no painel CONFIG
+        self.frames_since_change = 0
+        self.failures = [0] * len(QUALITY_LEVELS)
+
+    @property
+    def max_level(self):
+        return len(QUALITY_LEVELS) - 1
+
+    def current_level(self):
+        """Nível em uso: o fixo, se houver, senão o automático"""
+        return self.level if self.override == AUTO else self.override
+
+    def settings(self):
+        """(força relativa da distorção, scanlines, overlay, resolução interna) do nível atual"""
+        return QUALITY_LEVELS[self.current_level()]
+
+    def label(self):
+        """Texto do painel CONFIG: qualidade de max_level (máxima) a 0, com "A" se automática"""
+        quality = self.max_level - self.current_level()
+        return f"A{quality}" if self.override == AUTO else str(quality)
+
+    def set_override(self, level):
+        """Fixa um nível (AUTO volta ao ajuste automático)"""
+        self.override = level if level == AUTO else max(0, min(level, self.max_level))
+        self.samples.clear()
+        self.frames_since_change = 0
+
+    def cycle_override(self):
+        """AUTO -> qualidade máxima -> ... -> mínima -> AUTO"""
+        if self.override == AUTO:
+            self.set_override(0)
+        elif self.override >= self.max_level:
+            self.set_override(AUTO)
+        else:
+            self.set_override(self.override + 1)
+        return self.override
+
+    def update(self, frame_ms):
+        """
+        Registra o tempo de trabalho de um quadro
+
+        Returns:
+            True se o nível automático mudou
+        """
+        if self.override != AUTO:
+            return False
+        self.samples.append(frame_ms)
+        self.frames_since_change += 1
+        if len(self.samples) < self.samples.maxlen or self.frames_since_change < self.cooldown:
+            return False
+
+        mean = sum(self.samples) / len(self.samples)
+        if mean > self.budget_ms * self.down_ratio and self.level < self.max_level:
+            self.failures[self.level] += 1
+            self.level += 1
+        elif mean < self.budget_ms * self.up_ratio and self.level > 0:
+            # Volta a um nível que já falhou só depois de um recuo exponencial
+            if self.frames_since_change < self.cooldown * 2 ** self.failures[self.level - 1]:
+                return False
+            self.level -= 1
+        else:
+            return False
+        self.samples.clear()
+        self.frames_since_change = 0
+        return True
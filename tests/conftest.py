@@ -0,0 +1,26 @@
+import os
+import sys
+
+import pytest
+
+# Sem janela nem placa de som: os testes rodam em qualquer máquina
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+@pytest.fixture(scope="session")
+def app():
+    """App inicializado como em main.py, na raiz do repositório (assets e defs.ini)"""
+    cwd = os.getcwd()
+    os.chdir(ROOT)
+    with open("defs.ini") as f:
+        defs_backup = f.read()
+    import main
+    main.init_app()
+    yield main
+    # Configurações que o app salvou durante os testes são descartadas
+    with open(os.path.join(ROOT, "defs.ini"), "w") as f:
+        f.write(defs_backup)
+    os.chdir(cwd)
@@ -0,0 +1,39 @@
+import numpy as np
+import pygame
+
+import assets
+
+def blend(alpha, dest, premultiplied, monkeypatch):
+    """Canal vermelho de cada cor 0..255 com alpha desenhada sobre dest"""
+    monkeypatch.setitem(assets.DEFS, 'premultiplied_alpha', premultiplied)
+    surface = pygame.Surface((256, 1), pygame.SRCALPHA)
+    pixels = pygame.surfarray.pixels3d(surface)
+    pixels[:, 0, :] = np.arange(256)[:, np.newaxis]
+    del pixels
+    pixels = pygame.surfarray.pixels_alpha(surface)
+    pixels[:] = alpha
+    del pixels
+    screen = pygame.Surface((256, 1))
+    screen.fill((dest, dest, dest))
+    assets.blit(screen, assets.prepare(surface), (0, 0))
+    return pygame.surfarray.array3d(screen)[:, 0, 0].astype(int)
+
+def test_premultiplied_blit_rounding(monkeypatch):
+    pygame.display.init()
+    if pygame.display.get_surface() is None:
+        pygame.display.set_mode((1, 1))  # prepare converte para o formato da tela
+    for dest in (0, 22, 128, 255):
+        for alpha in range(0, 256, 5):
+            error = np.abs(blend(alpha, dest, True, monkeypatch) - blend(alpha, dest, False, monkeypatch))
+            if alpha in (0, 255):
+                assert error.max() == 0
+            else:
+                assert error.max() <= 1
+
+def test_prepare_empty_text_surface(monkeypatch):
+    pygame.display.init()
+    if pygame.display.get_surface() is None:
+        pygame.display.set_mode((1, 1))
+    monkeypatch.setitem(assets.DEFS, 'premultiplied_alpha', True)
+    empty = assets.prepare(pygame.Surface((0, 13), pygame.SRCALPHA))
+    assert empty.get_size() == (0, 13)
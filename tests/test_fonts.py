@@ -0,0 +1,35 @@
+import pygame
+
+from fonts import TextCache
+
+def surface(width):
+    return pygame.Surface((width, 10), 0, 32)  # width * 40 bytes
+
+def test_text_cache_evicts_least_recently_used_over_the_byte_limit():
+    cache = TextCache(max_bytes=3 * 400)
+    renders = []
+    def get(key):
+        def render():
+            renders.append(key)
+            return surface(10)
+        return cache.get(key, render)
+
+    first = get("a")
+    get("b")
+    get("c")
+    assert cache.bytes == 1200 and cache.evictions == 0
+    assert get("a") is first      # Acerto: "a" passa a ser o mais recente
+    get("d")                      # Passa do limite: sai "b", o menos usado
+    assert list(cache.surfaces) == ["c", "a", "d"]
+    assert cache.evictions == 1 and cache.bytes == 1200
+    get("b")
+    assert renders == ["a", "b", "c", "d", "b"]
+    assert list(cache.surfaces) == ["a", "d", "b"]
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 5
+
+def test_text_cache_skips_surfaces_larger_than_the_limit():
+    cache = TextCache(max_bytes=400)
+    cache.get("small", lambda: surface(10))
+    big = cache.get("big", lambda: surface(20))
+    assert big.get_width() == 20
+    assert list(cache.surfaces) == ["small"] and cache.bytes == 400
@@ -0,0 +1,71 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pygame
+
+import graphics
+
+def float_barrel(array, strength):
+    """Distorção de referência: interpolação bilinear em ponto flutuante"""
+    width, height = array.shape[:2]
+    center_x = width / 2
+    center_y = height / 2
+    dx = (np.arange(width)[:, np.newaxis] - center_x) / center_x
+    dy = (np.arange(height)[np.newaxis, :] - center_y) / center_y
+    factor = 1 + strength * (dx ** 2 + dy ** 2)
+    source_x = center_x + dx * factor * center_x
+    source_y = center_y + dy * factor * center_y
+    x0 = np.floor(source_x).astype(int)
+    y0 = np.floor(source_y).astype(int)
+    valid = (x0 >= 0) & (x0 < width - 1) & (y0 >= 0) & (y0 < height - 1)
+    x0 = np.where(valid, x0, 0)
+    y0 = np.where(valid, y0, 0)
+    wx = (source_x - x0)[..., np.newaxis]
+    wy = (source_y - y0)[..., np.newaxis]
+    src = array.astype(np.float64)
+    result = (src[x0, y0] * (1 - wx) * (1 - wy) + src[x0 + 1, y0] * wx * (1 - wy) +
+              src[x0, y0 + 1] * (1 - wx) * wy + src[x0 + 1, y0 + 1] * wx * wy)
+    result[~valid] = 0
+    return np.clip(result, 0, 255).astype(np.uint8)
+
+def test_distortion_matches_float_interpolation():
+    pygame.display.init()
+    rng = np.random.default_rng(0)
+    array = rng.integers(0, 256, (320, 180, 3), dtype=np.uint8)
+    for depth in (32, 24):
+        surface = pygame.Surface(array.shape[:2], 0, depth)
+        pygame.surfarray.blit_array(surface, array)
+        for strength in (0.04, 0.05, 0.2):
+            distorted = graphics.apply_barrel_distortion(surface, strength)
+            error = np.abs(pygame.surfarray.array3d(distorted).astype(int) -
+                           float_barrel(array, strength))
+            assert error.max() <= graphics.DistortionEngine.MAX_ERROR
+
+def test_split_bands_covers_every_row_once():
+    for height in (1, 5, 6, 7, 180):
+        for count in (1, 2, 3, 4, height + 3):
+            bands = graphics.split_bands(height, count)
+            assert len(bands) <= count
+            rows = [row for start, end in bands for row in range(start, end)]
+            assert rows == list(range(height))
+
+def test_banded_remap_matches_serial():
+    pygame.display.init()
+    rng = np.random.default_rng(1)
+    engine = graphics.DistortionEngine()
+    for width, height in ((64, 36), (40, 3)):
+        source = pygame.Surface((width, height), 0, 32)
+        pygame.surfarray.blit_array(source, rng.integers(0, 256, (width, height, 3), dtype=np.uint8))
+        with ThreadPoolExecutor(max_workers=3) as pool:
+            for scanlines in (None, (3, 80, 1)):
+                serial = source.copy()
+                engine.remap(source, serial, 0.05, scanlines)
+                expected = pygame.surfarray.array2d(serial)
+                for bands in (2, 3, 4, height + 5):
+                    banded = source.copy()
+                    engine.remap(source, banded, 0.05, scanlines, pool=pool, bands=bands)
+                    assert np.array_equal(pygame.surfarray.array2d(banded), expected)
+                    # Origem e destino podem ser a mesma superfície
+                    in_place = source.copy()
+                    engine.remap(in_place, in_place, 0.05, scanlines, pool=pool, bands=bands)
+                    assert np.array_equal(pygame.surfarray.array2d(in_place), expected)
@@ -0,0 +1,55 @@
+import random
+
+from motion import MotionTracker
+
+def sign(value):
+    return (value > 0) - (value < 0)
+
+def reference(samples):
+    """Distância, inversões, duração e deslocamento líquido de uma lista de (x, y, t)"""
+    steps = [(b[0] - a[0], b[1] - a[1]) for a, b in zip(samples, samples[1:])]
+    distance = sum(abs(dx) + abs(dy) for dx, dy in steps)
+    turns = sum(1 for (ax, ay), (bx, by) in zip(steps, steps[1:])
+                if sign(ax) * sign(bx) < 0 or sign(ay) * sign(by) < 0)
+    span = samples[-1][2] - samples[0][2] if len(samples) > 1 else 0
+    net = (samples[-1][0] - samples[0][0], samples[-1][1] - samples[0][1]) if samples else (0, 0)
+    return distance, turns, span, net
+
+def test_ring_buffer_matches_plain_list():
+    rng = random.Random(3)
+    tracker = MotionTracker(capacity=16, window_ms=200)
+    samples = []
+    x, y, t = 100, 100, 0
+    for _ in range(500):  # Bem mais amostras que a capacidade: o buffer dá várias voltas
+        x += rng.randint(-20, 20)
+        y += rng.choice((-5, 0, 0, 5))
+        t += rng.choice((1, 5, 16, 40, 250))
+        tracker.add((x, y), t)
+        samples.append((x, y, t))
+        samples = [s for s in samples if t - s[2] < 200][-16:]
+
+        distance, turns, span, net = reference(samples)
+        assert tracker.count == len(samples)
+        assert tracker.position == (x, y)
+        assert tracker.distance == distance
+        assert tracker.direction_changes == turns
+        assert tracker.span() == span
+        if span:
+            assert tracker.speed() == distance * 1000.0 / span
+            assert tracker.velocity() == (net[0] * 1000.0 / span, net[1] * 1000.0 / span)
+            assert tracker.direction_change_rate() == turns * 1000.0 / span
+        else:
+            assert tracker.speed() == 0.0
+            assert tracker.velocity() == (0.0, 0.0)
+
+def test_expire_and_clear_keep_last_position():
+    tracker = MotionTracker(capacity=4, window_ms=100)
+    for i in range(6):
+        tracker.add((i * 10, 0), i * 10)
+    assert tracker.count == 4
+    tracker.expire(1000)
+    assert tracker.count == 0 and tracker.distance == 0 and tracker.direction_changes == 0
+    assert tracker.position == (50, 0)
+    tracker.add((0, 0), 1000)
+    tracker.clear()
+    assert tracker.count == 0 and tracker.position == (0, 0)
@@ -0,0 +1,50 @@
+import quality
+from quality import QualityGovernor
+
+def feed(governor, frame_ms, frames):
+    """Quadros (contados a partir de 1) em que o nível mudou"""
+    return [i for i in range(1, frames + 1) if governor.update(frame_ms)]
+
+def make_governor():
+    # Orçamento de 10 ms: desce acima de 10.5 ms, sobe abaixo de 6 ms
+    return QualityGovernor(budget_ms=10, window=4, cooldown=8)
+
+def test_steps_down_one_level_per_cooldown_until_the_lowest():
+    governor = make_governor()
+    assert feed(governor, 20, 100) == [8, 16, 24, 32, 40]
+    assert governor.level == governor.max_level
+    assert governor.settings() == quality.QUALITY_LEVELS[-1]
+
+def test_hysteresis_band_keeps_the_level():
+    governor = make_governor()
+    assert feed(governor, 8, 200) == []
+    governor = make_governor()
+    assert feed(governor, 20, 8) == [8]
+    assert feed(governor, 8, 200) == []         # Nem sobe nem desce
+    assert governor.level == 1
+
+def test_return_to_a_failed_level_backs_off_exponentially():
+    governor = make_governor()
+    assert feed(governor, 20, 8) == [8]         # Nível 0 falhou uma vez
+    assert feed(governor, 2, 16) == [16]        # Volta depois de cooldown * 2
+    assert governor.level == 0
+    assert feed(governor, 20, 8) == [8]         # Falhou de novo
+    assert feed(governor, 2, 32) == [32]        # Agora espera cooldown * 4
+    assert governor.level == 0
+    assert feed(governor, 2, 100) == []         # Já está no topo
+
+def test_untried_levels_come_back_after_the_plain_cooldown():
+    governor = make_governor()
+    feed(governor, 20, 16)
+    assert governor.level == 2
+    # O nível 1 falhou uma vez: espera cooldown * 2 antes de voltar a ele
+    assert feed(governor, 2, 16) == [16]
+    assert governor.level == 1
+
+def test_override_freezes_the_automatic_level():
+    governor = make_governor()
+    governor.set_override(3)
+    assert feed(governor, 20, 100) == []
+    assert governor.current_level() == 3 and governor.label() == "2"
+    governor.set_override(quality.AUTO)
+    assert governor.current_level() == 0 and governor.label() == "A5"
@@ -0,0 +1,97 @@
+import pygame
+
+import ui
+
+def paint_button(button, text=None):
+    """Pixels do botão desenhado sozinho numa superfície vazia"""
+    if text is not None:
+        button.text = text
+    button.resolve()
+    surface = pygame.Surface((ui.PROPSYS.screen_width, ui.PROPSYS.screen_height))
+    button.paint(surface)
+    return pygame.image.tobytes(surface, "RGB")
+
+def test_music_toggle_survives_panel_rebuild(app, monkeypatch):
+    player = app.GAME_CLOCK.player
+    ui.show_content("MUSIC")
+    monkeypatch.setattr(player, "is_playing", True)
+
+    # Abre outros painéis até o MUSIC sair do PANEL_LRU e ser descartado
+    for menu in ("MENU", "GPS", "INFO"):
+        ui.show_content(menu)
+    assert "MUSIC" not in ui.user_interface['content_panel'].subelements
+
+    panel = ui.show_content("MUSIC")
+    button = ui.LAYOUT.find("music_pause", within=panel)
+    playing = paint_button(button)
+    assert playing == paint_button(button, "!SPRITE_pause")
+    assert playing != paint_button(button, "!SPRITE_play")
+
+    monkeypatch.setattr(player, "is_playing", False)
+    assert paint_button(button, "!music_toggle") == paint_button(button, "!SPRITE_play")
+
+def hover_events():
+    return [(event.element, event.hovering) for event in pygame.event.get(ui.UI_HOVER)]
+
+def test_hit_grid_matches_brute_force(app):
+    width, height = ui.PROPSYS.screen_width, ui.PROPSYS.screen_height
+    for menu in ui.categories:
+        ui.show_content(menu)
+        clickable = ui.clickable_elements()
+        assert clickable
+        for x in range(0, width, 7):
+            for y in range(0, height, 7):
+                expected = [element for element in clickable if element.rect.collidepoint((x, y))]
+                assert ui.HIT_GRID.query((x, y)) == expected
+
+def test_hit_grid_hover_enter_and_leave(app):
+    panel = ui.show_content("MUSIC")
+    button = ui.LAYOUT.find("music_next", within=panel)
+    outside = (0, 0)
+    assert not ui.HIT_GRID.query(outside)
+    ui.HIT_GRID.hover(outside)
+    hover_events()
+
+    ui.HIT_GRID.hover(button.rect.center)
+    assert hover_events() == [(button, True)]
+    ui.HIT_GRID.hover(button.rect.center)
+    assert hover_events() == []
+    ui.HIT_GRID.hover(outside)
+    assert hover_events() == [(button, False)]
+
+def test_panel_change_hovers_element_under_still_cursor(app):
+    panel = ui.show_content("MUSIC")
+    center = ui.LAYOUT.find("music_next", within=panel).rect.center
+    ui.show_content("MENU")
+    ui.HIT_GRID.hover(center)
+    hover_events()
+
+    panel = ui.show_content("MUSIC")
+    assert (ui.LAYOUT.find("music_next", within=panel), True) in hover_events()
+    ui.HIT_GRID.hover((0, 0))
+    hover_events()
+
+RESPONSE = ("O TeeVee responde com uma frase bem comprida para ocupar várias páginas "
+            "da caixa de resposta, com palavras curtas e algumas extraordinariamente longas ") * 6
+
+def test_response_pages_fit_the_box(app):
+    panel = ui.show_content("MENU")
+    box = ui.LAYOUT.find("response_text", within=panel)
+    assert box is not None
+    pages = ui.paginate_response(RESPONSE)
+    assert len(pages) > 1
+    assert ' '.join(pages).split() == RESPONSE.split()
+
+    max_width = box.rect.width * 0.9
+    widths = ui.FONTS.char_widths(ui.font, box.font_size)
+    line_height = ui.FONTS.get(ui.font, box.font_size).get_height()
+    for page in pages:
+        lines = ui.wrap_words(widths, page.split(), max_width)
+        assert len(lines) * line_height <= box.rect.height
+        for line in lines:
+            assert widths.text(line) <= max_width or ' ' not in line
+
+def test_response_pages_fall_back_without_metrics(app, monkeypatch):
+    monkeypatch.setattr(ui, "_response_metrics", None)
+    monkeypatch.setattr(ui.LAYOUT, "find", lambda key, within=None: None)
+    assert ui.paginate_response(RESPONSE) == ui.split_response_into_pages(RESPONSE, ui.max_chars_per_page)
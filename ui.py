@@ -1,6 +1,10 @@
 import io
 import pygame
+import numpy as np
+from collections import OrderedDict
 import os
+import assets
+from fonts import TEXT_CACHE, FONTS, wrap_words
 from config import DICT, DEFS, getVars
 from game_clock import Glock
 from graphics import TeeVee
@@ -12,6 +16,7 @@ import copy
 PROPSYS = None
 GAME_CLOCK = None
 TV = None
+GOVERNOR = None
 glock = None
 primary_color = None
 background_color = None
@@ -33,10 +38,25 @@ response_pages = []  # Lista de páginas da resposta
 current_page = 0     # Página atual (0-indexed)
 max_chars_per_page = 150  # Caracteres por página
 
+# Escala da fonte de elementos clicáveis com o mouse em cima
+HOVER_FONT_SCALE = 1.2
+
+# Comandos que desenham algo na tela em vez de produzir texto
+DRAW_COMMANDS = ("tv", "music_display", "map_render", "music_toggle")
+
+# Versão de cada fonte de dados dos textos "!comando"; refresh_sources
+# incrementa a versão quando o valor da fonte muda
+SOURCE_VERSIONS = {name: 0 for name in ("panel", "frame", "toggles", "quality", "chat", "clock", "info", "metadata")}
+_source_snapshots = {}
+
 def set_tv(tv_instance):
     global TV
     TV = tv_instance
 
+def set_governor(governor):
+    global GOVERNOR
+    GOVERNOR = governor
+
 def set_map_system(map_sys):
     global MAP_SYSTEM
     MAP_SYSTEM = map_sys
@@ -67,6 +87,113 @@ def split_response_into_pages(text, max_chars=150):
     
     return pages if pages else [text]
 
+# Métricas do elemento response_text vistas por último: (tamanho da fonte,
+# largura da quebra, altura da caixa). O painel pode não estar construído
+# quando a resposta chega
+_response_metrics = None
+
+def response_metrics():
+    """(tamanho da fonte, largura da quebra, altura) de response_text, ou None"""
+    global _response_metrics
+    element = LAYOUT.find('response_text')
+    if element is not None:
+        _response_metrics = (element.font_size, element.rect.width * 0.9, element.rect.height)
+    return _response_metrics
+
+def paginate_response(text):
+    """
+    Divide a resposta em páginas que cabem em response_text
+
+    Usa a mesma quebra de UElement._wrap_text (fonts.wrap_words, até 90% da
+    largura), medindo com a tabela de larguras da fonte, em tempo linear e
+    sem renderizar nada. Sem métricas conhecidas, cai no limite de caracteres.
+    """
+    metrics = response_metrics()
+    if metrics is None:
+        return split_response_into_pages(text, max_chars_per_page)
+    font_size, max_width, height = metrics
+    lines_per_page = max(1, height // FONTS.get(font, font_size).get_height())
+    lines = wrap_words(FONTS.char_widths(font, font_size), text.split(), max_width)
+    pages = [' '.join(lines[i:i + lines_per_page]) for i in range(0, len(lines), lines_per_page)]
+    return pages if pages else [text]
+
+
+def _update_chat_cursor():
+    """Pisca o cursor do chat a cada 500ms"""
+    global chat_cursor_timer, chat_cursor_visible
+    current_time = pygame.time.get_ticks()
+    if current_time - chat_cursor_timer >= 500:
+        chat_cursor_timer = current_time
+        chat_cursor_visible = not chat_cursor_visible
+
+def _resolve_chat_input():
+    # Mostra cursor "I" apenas se campo estiver ativo
+    if chat_input_active and chat_cursor_visible:
+        return chat_input + " I"  # Cursor "I" com espaço
+    return chat_input
+
+def _resolve_teevee_response():
+    # Exibe a resposta do TeeVee ou mensagem de espera
+    if waiting_for_response:
+        return "Pensando..."
+    return chat_response if chat_response else ""
+
+def _resolve_page_indicator():
+    # Exibe indicador de página (ex: <1/3>)
+    if response_pages and len(response_pages) > 1:
+        return f"<{current_page + 1}/{len(response_pages)}>"
+    return ""
+
+def _resolve_clock_value(command):
+    if GAME_CLOCK and (command in GAME_CLOCK.vals):
+        return GAME_CLOCK.vals[command]
+    if GAME_CLOCK and (command in GAME_CLOCK.info):
+        return str(GAME_CLOCK.info[command])
+    if GAME_CLOCK and (command in GAME_CLOCK.player.metadata):
+        return str(GAME_CLOCK.player.metadata[command])
+    return "N/A"
+
+def _source_snapshot(name):
+    """Valor atual de uma fonte de dados, comparável com o do quadro anterior"""
+    if name == "panel":
+        return getVars('content_index')
+    if name == "toggles":
+        return dict(DEFS)
+    if name == "quality":
+        return GOVERNOR.label() if GOVERNOR else None
+    if name == "chat":
+        return (chat_input, chat_input_active and chat_cursor_visible, waiting_for_response,
+                chat_response, current_page, len(response_pages))
+    if not GAME_CLOCK:
+        return None
+    if name == "clock":
+        return GAME_CLOCK.vals  # Recriado a cada update
+    if name == "info":
+        return dict(GAME_CLOCK.info)  # Atualizado no lugar
+    if name == "metadata":
+        return GAME_CLOCK.player.metadata  # Trocado a cada música
+    return None
+
+def refresh_sources():
+    """
+    Uma vez por quadro: compara cada fonte de dados com o quadro anterior e
+    incrementa a versão das que mudaram. "frame" muda sempre (progresso da música)
+
+    Returns:
+        True se alguma fonte além de "frame" mudou
+    """
+    _update_chat_cursor()
+    SOURCE_VERSIONS["frame"] += 1
+    changed = False
+    for name in SOURCE_VERSIONS:
+        if name == "frame":
+            continue
+        snapshot = _source_snapshot(name)
+        if name not in _source_snapshots or _source_snapshots[name] != snapshot:
+            _source_snapshots[name] = snapshot
+            SOURCE_VERSIONS[name] += 1
+            changed = True
+    return changed
 
 def init_ui_system(width, height, game_clock):
     global PROPSYS, GAME_CLOCK, categories, glock, primary_color, background_color, secondary_color, user_interface
@@ -80,6 +207,58 @@ def init_ui_system(width, height, game_clock):
     background_color = DEFS['bg']
     secondary_color = DEFS["sec"]
     
+    create_user_interface()
+    report_fonts()
+
+def resize_ui(width, height):
+    """Reconstrói a árvore de UI para uma nova resolução de desenho"""
+    global PROPSYS, _response_metrics
+    PROPSYS = ProportionalSystem(width, height)
+    user_interface.clear()
+    # Os tamanhos em px mudam com a resolução
+    FONTS.clear()
+    _response_metrics = None
+    create_user_interface()
+    report_fonts()
+
+def live_font_sizes():
+    """Tamanhos de fonte em uso pelos elementos da árvore"""
+    sizes = set()
+    pending = list(user_interface.values())
+    while pending:
+        element = pending.pop()
+        sizes.add(element.font_size)
+        pending.extend(element.subelements.values())
+    return sizes
+
+def report_fonts():
+    print(f"🔤 Fontes: {len(FONTS.sizes(font))} tamanhos carregados, {len(live_font_sizes())} em uso")
+
+def font_px(font_size_percent):
+    """Tamanho em px da fonte para uma porcentagem da altura da tela"""
+    return int(PROPSYS.percent_to_px_y(font_size_percent)) * 2
+
+def dictionary_font_sizes(node):
+    """Todos os font_size_percent usados em dictionary.json"""
+    sizes = set()
+    if isinstance(node, dict):
+        if 'font_size_percent' in node:
+            sizes.add(node['font_size_percent'])
+        for value in node.values():
+            sizes |= dictionary_font_sizes(value)
+    elif isinstance(node, list):
+        for value in node:
+            sizes |= dictionary_font_sizes(value)
+    return sizes
+
+def preload_fonts():
+    """Carrega os tamanhos de dictionary.json (e o padrão), normais e com hover"""
+    percents = dictionary_font_sizes(DICT) | {0.1}
+    FONTS.preload(font, {font_px(percent * scale) for percent in percents for scale in (1, HOVER_FONT_SCALE)})
+
+def create_user_interface():
+    """Monta os painéis fixos e o conteúdo de DICT['contentvals'] no tamanho de PROPSYS"""
+    preload_fonts()
     # Define interface do usuário
     user_interface.update({
         "background": UElement(
@@ -158,6 +337,8 @@ def init_ui_system(width, height, game_clock):
     })
     
     build_ui()
+    LAYOUT.build(user_interface)
+    refresh_hit_grid()
 
 class ProportionalSystem:
     def __init__(self, screen_width, screen_height):
@@ -203,6 +384,82 @@ class ProportionalSystem:
             self.percent_to_px_y(height_percent)
         )
 
+# Camadas de gradiente/brilho e fundos completos dos elementos, prontos para
+# blit: LRU por (tipo, largura, altura, cor, variante, raio)
+BACKGROUND_CACHE = OrderedDict()
+MAX_BACKGROUNDS = 256
+
+def cached_surface(key, builder):
+    """Retorna a superfície de key no BACKGROUND_CACHE, construindo com builder() se faltar"""
+    surface = BACKGROUND_CACHE.get(key)
+    if surface is not None:
+        BACKGROUND_CACHE.move_to_end(key)
+        return surface
+    surface = builder()
+    BACKGROUND_CACHE[key] = surface
+    if len(BACKGROUND_CACHE) > MAX_BACKGROUNDS:
+        BACKGROUND_CACHE.popitem(last=False)
+    return surface
+
+def rounded_mask(width, height, border_radius, rect_height=None):
+    """Máscara booleana (largura x altura) de um retângulo arredondado"""
+    mask = pygame.Surface((width, height), pygame.SRCALPHA)
+    pygame.draw.rect(mask, (255, 255, 255, 255), pygame.Rect(0, 0, width, rect_height or height),
+                     border_radius=border_radius)
+    return pygame.surfarray.array_alpha(mask) > 0
+
+def rows_layer(width, height, colors, alphas, inside):
+    """
+    Camada SRCALPHA com uma cor e um alpha por linha, recortada pela máscara
+
+    Args:
+        colors: Array (altura, 3) com a cor de cada linha
+        alphas: Array (altura,) com o alpha de cada linha
+        inside: Máscara booleana (largura, altura)
+    """
+    layer = pygame.Surface((width, height), pygame.SRCALPHA)
+    pixels = pygame.surfarray.pixels3d(layer)
+    pixels[:] = colors[np.newaxis, :, :] * inside[:, :, np.newaxis]
+    del pixels
+    alpha = pygame.surfarray.pixels_alpha(layer)
+    alpha[:] = alphas[np.newaxis, :] * inside
+    del alpha
+    return layer
+
+def gradient_layer(width, height, base_color, intensity=0.5, opacity=150, border_radius=30):
+    """Camada do gradiente vertical arredondado (cacheada)"""
+    key = ("gradient", width, height, tuple(base_color[:3]), intensity, opacity, border_radius)
+
+    def build():
+        # Gradiente de cima para baixo - escurece progressivamente
+        progress = np.arange(height) / height
+        colors = (np.array(base_color[:3])[np.newaxis, :] * (1 - progress * intensity)[:, np.newaxis]).astype(np.uint8)
+        alphas = (opacity * progress).astype(np.uint8)  # Aumenta opacidade conforme desce
+        return rows_layer(width, height, colors, alphas, rounded_mask(width, height, border_radius))
+
+    return cached_surface(key, build)
+
+def shine_layer(width, shine_height, intensity, border_radius, base_color):
+    """Camada do brilho arredondado (cacheada); só os cantos de cima são arredondados"""
+    r, g, b = base_color[:3]
+    # Cor escura - brilho clarificado; cor clara - escurecimento sutil
+    dark = (r + g + b) / 3 < 128
+    key = ("shine", width, shine_height, (r, g, b) if dark else None, intensity, border_radius)
+
+    def build():
+        progress = np.arange(shine_height) / shine_height
+        if dark:
+            shine_color = (min(255, int(r * 2.5)), min(255, int(g * 2.5)), min(255, int(b * 2.5)))
+            alphas = (intensity * 0.5 * (1 - progress)).astype(np.uint8)  # Intensidade reduzida
+        else:
+            shine_color = (0, 0, 0)  # Usa preto para escurecer
+            alphas = (intensity * 0.3 * (1 - progress)).astype(np.uint8)  # Intensidade mais baixa
+        colors = np.tile(np.array(shine_color, dtype=np.uint8), (shine_height, 1))
+        inside = rounded_mask(width, shine_height, border_radius, rect_height=shine_height * 2)
+        return rows_layer(width, shine_height, colors, alphas, inside)
+
+    return cached_surface(key, build)
+
 def apply_gradient_effect(surface, width, height, base_color, intensity=0.5, opacity=150, border_radius=30):
     """
     Aplica efeito de gradiente vertical arredondado em uma superfície
@@ -221,32 +478,7 @@ def apply_gradient_effect(surface, width, height, base_color, intensity=0.5, opa
     """
     if width < 10 or height < 10:
         return surface
-    
-    # Cria superfície para o gradiente
-    gradient_surface = pygame.Surface((width, height), pygame.SRCALPHA)
-    r, g, b = base_color[:3]
-    
-    for i in range(height):
-        # Gradiente de cima para baixo - escurece progressivamente
-        progress = i / height
-        # Escurece a cor base
-        dark_r = int(r * (1 - progress * intensity))
-        dark_g = int(g * (1 - progress * intensity))
-        dark_b = int(b * (1 - progress * intensity))
-        alpha = int(opacity * progress)  # Aumenta opacidade conforme desce
-        
-        pygame.draw.line(gradient_surface, (dark_r, dark_g, dark_b, alpha), 
-                       (0, i), (width, i))
-    
-    # Aplica máscara arredondada ao gradiente
-    gradient_mask = pygame.Surface((width, height), pygame.SRCALPHA)
-    mask_rect = pygame.Rect(0, 0, width, height)
-    pygame.draw.rect(gradient_mask, (255, 255, 255, 255), mask_rect, border_radius=border_radius)
-    gradient_surface.blit(gradient_mask, (0, 0), special_flags=pygame.BLEND_RGBA_MIN)
-    
-    # Aplica gradiente na superfície principal
-    surface.blit(gradient_surface, (0, 0))
-    
+    surface.blit(gradient_layer(width, height, base_color, intensity, opacity, border_radius), (0, 0))
     return surface
 
 def apply_shine_effect(surface, width, height, intensity=40, shine_percent=0.3, border_radius=30, offset_y=5, base_color=(255, 255, 255)):
@@ -272,51 +504,73 @@ def apply_shine_effect(surface, width, height, intensity=40, shine_percent=0.3,
     shine_height = int(height * shine_percent)
     if shine_height <= 0:
         return surface
-    
-    # Calcula cor de brilho adaptativa baseada na cor base
-    r, g, b = base_color[:3]
-    brightness = (r + g + b) / 3
-    
-    # Cria superfície para o brilho
-    shine_surface = pygame.Surface((width, shine_height), pygame.SRCALPHA)
-    
-    if brightness < 128:  # Cor escura - usa brilho clarificado
-        # Para cores escuras, desenha gradiente da cor clarificada
-        for i in range(shine_height):
-            # Gradiente que diminui conforme desce
-            progress = i / shine_height
-            alpha = int(intensity * 0.5 * (1 - progress))  # Intensidade reduzida
-            
-            # Clarifica a cor base
-            shine_r = min(255, int(r * 2.5))
-            shine_g = min(255, int(g * 2.5))
-            shine_b = min(255, int(b * 2.5))
-            
-            # Desenha linha do gradiente
-            pygame.draw.line(shine_surface, (shine_r, shine_g, shine_b, alpha), 
-                           (0, i), (width, i))
-    else:  # Cor clara - usa escurecimento sutil
-        # Para cores claras, desenha gradiente escuro para criar profundidade
-        for i in range(shine_height):
-            progress = i / shine_height
-            # Escurecimento sutil que diminui conforme desce
-            alpha = int(intensity * 0.3 * (1 - progress))  # Intensidade mais baixa
-            
-            # Usa preto para escurecer
-            pygame.draw.line(shine_surface, (0, 0, 0, alpha), 
-                           (0, i), (width, i))
-    
-    # Aplica máscara arredondada
-    mask = pygame.Surface((width, shine_height), pygame.SRCALPHA)
-    mask_rect = pygame.Rect(0, 0, width, shine_height * 2)
-    pygame.draw.rect(mask, (255, 255, 255, 255), mask_rect, border_radius=border_radius)
-    shine_surface.blit(mask, (0, 0), special_flags=pygame.BLEND_RGBA_MIN)
-    
-    # Desenha o brilho na superfície principal
-    surface.blit(shine_surface, (0, offset_y))
-    
+    surface.blit(shine_layer(width, shine_height, intensity, border_radius, base_color), (0, offset_y))
     return surface
 
+def build_filled_background(width, height, color):
+    """Fundo preenchido (inverted_colors): retângulo, gradiente, brilho e borda interna"""
+    # Cria superfície temporária para efeitos
+    temp_surface = pygame.Surface((width, height), pygame.SRCALPHA)
+
+    # Desenha retângulo base com cantos arredondados
+    temp_rect = pygame.Rect(0, 0, width, height)
+    pygame.draw.rect(temp_surface, color, temp_rect, border_radius=30)
+
+    # Aplica gradiente usando função reutilizável
+    apply_gradient_effect(temp_surface, width, height,
+                        color, intensity=0.5, opacity=150, border_radius=30)
+
+    # Aplica brilho usando função reutilizável com cor adaptativa
+    apply_shine_effect(temp_surface, width, height,
+                     intensity=40, shine_percent=0.3, border_radius=30, offset_y=5, base_color=color)
+
+    # Adiciona borda interna sutil para definição
+    inner_rect = pygame.Rect(2, 2, width - 4, height - 4)
+    pygame.draw.rect(temp_surface, (*color[:3], 100), inner_rect, 1, border_radius=28)
+    return temp_surface
+
+def build_outlined_background(width, height, color, outline_size):
+    """Fundo contornado: borda, brilho interno e destaque na borda superior"""
+    # Cria superfície temporária para efeitos
+    temp_surface = pygame.Surface((width, height), pygame.SRCALPHA)
+
+    # Desenha borda externa com brilho
+    temp_rect = pygame.Rect(0, 0, width, height)
+
+    # Borda principal
+    pygame.draw.rect(temp_surface, color, temp_rect, outline_size, border_radius=30)
+
+    # Aplica brilho usando função reutilizável com cor adaptativa
+    if width > outline_size * 2:
+        # Cria superfície temporária para o brilho interno
+        shine_width = width - outline_size * 2
+        shine_height_total = height - outline_size * 2
+        inner_shine_surface = pygame.Surface((shine_width, shine_height_total), pygame.SRCALPHA)
+
+        apply_shine_effect(inner_shine_surface, shine_width, shine_height_total,
+                         intensity=60, shine_percent=0.15, border_radius=25, offset_y=0, base_color=color)
+
+        temp_surface.blit(inner_shine_surface, (outline_size, outline_size))
+
+    # Adiciona destaque na borda superior (highlight)
+    highlight_thickness = max(1, outline_size // 2)
+    highlight_rect = pygame.Rect(outline_size, outline_size,
+                                width - outline_size * 2,
+                                height - outline_size * 2)
+
+    # Cor de destaque (mais clara)
+    highlight_color = tuple(min(255, c + 40) for c in color[:3])
+    pygame.draw.rect(temp_surface, (*highlight_color, 80), highlight_rect,
+                   highlight_thickness, border_radius=25)
+    return temp_surface
+
+def element_background(width, height, color, inverted, outline_size):
+    """Fundo completo de um elemento, pronto para assets.blit (cacheado)"""
+    if inverted:
+        key = ("filled", width, height, tuple(color), None, 30)
+        return cached_surface(key, lambda: assets.prepare(build_filled_background(width, height, color)))
+    key = ("outlined", width, height, tuple(color), outline_size, 30)
+    return cached_surface(key, lambda: assets.prepare(build_outlined_background(width, height, color, outline_size)))
 
 
 class UElement:
@@ -362,10 +616,18 @@ class UElement:
         self.inverted_colors = inverted_colors
         self.background = background
         # Tamanho da fonte proporcional
-        font_size = int(PROPSYS.percent_to_px_y(font_size_percent))
-        self.font = pygame.font.Font(font, font_size*2)
+        self.font_size = font_px(font_size_percent)
+        self.font = FONTS.get(font, self.font_size)
         self.text_align = text_align
         color = color if not inverted_colors else DEFS['bg']
+        self.font_scale = 1
+        self.rendered_text = str(text)
+        self._parsed_text = None
+        self._tokens = None
+        self._draw_commands = []
+        self.sources = ()
+        self._source_versions = None
+        self._album_art = None  # (capa, tamanho, superfície pronta)
         self.text_surface = self._render_text_wrapped(text, color)
         self.text_rect = self.text_surface.get_rect(center=self.rect.center)
         
@@ -375,6 +637,7 @@ class UElement:
             self.text_rect.right = self.rect.right * 0.9
             
         self.font_size_percent = font_size_percent
+        self.bounds = self.rect.union(self.text_rect)
         
         # Processa subelementos
         self.subelements = {}
@@ -383,26 +646,16 @@ class UElement:
                 self.add_subelement(subelement_key, subelement_dict)
 
     def _render_text_wrapped(self, text, color):
+        """Renderiza texto com quebra de linha automática, via TEXT_CACHE"""
+        key = (font, self.font_size, str(text), tuple(color), self.rect.width, self.text_align)
+        # Fica no cache e é desenhado a cada quadro: já no formato da tela
+        return TEXT_CACHE.get(key, lambda: assets.prepare(self._wrap_text(text, color)))
+
+    def _wrap_text(self, text, color):
         """Renderiza texto com quebra de linha automática se for muito largo"""
-        words = str(text).split(' ')
-        lines = []
-        current_line = []
-        
-        for word in words:
-            test_line = ' '.join(current_line + [word])
-            test_surface = self.font.render(test_line, True, color)
-            
-            if test_surface.get_width() <= self.rect.width * 0.9:
-                current_line.append(word)
-            else:
-                if current_line:
-                    lines.append(' '.join(current_line))
-                    current_line = [word]
-                else:
-                    lines.append(word)
-        
-        if current_line:
-            lines.append(' '.join(current_line))
+        # Mede as palavras pela tabela de larguras e renderiza cada linha uma vez
+        widths = FONTS.char_widths(font, self.font_size)
+        lines = wrap_words(widths, str(text).split(' '), self.rect.width * 0.9)
         
         if not lines:
             return self.font.render('', True, color)
@@ -445,262 +698,284 @@ class UElement:
             visible=subelement_dict.get('visible', True)
         )
 
-    def draw(self,screen):
-        if not self.visible:
+    def compile_text(self):
+        """
+        Compila self.text em um template: cada palavra vira um literal ou um
+        (prefixo, resolvedor) já vinculado ao comando, e o elemento guarda de
+        quais fontes de dados (SOURCE_VERSIONS) o valor depende
+        """
+        self._parsed_text = self.text
+        self._tokens = None
+        self._draw_commands = []
+        self.sources = ()
+        self._source_versions = None
+        if '!' not in self.text:
             return
-        # Parse text for variables
-        txt = self.text
-        if '!' in self.text:
-            words = self.text.split(' ')
-            new_words = []
-            for word in words:
-                if '!' in word:
-                    # Lida com casos como "Rain: !weather_rain %" onde ! está dentro
-                    # Precisamos extrair o nome da variável. Assumindo formato simples !var
-                    # ou !var_name
-                    
-                    # Abordagem simples: se palavra começa com !, tenta substituir
-                    # Se contém !, divide por ! e substitui a parte depois
-                    
-                    prefix = ""
-                    suffix = ""
-                    command = word
-                    
-                    if '!' in word:
-                        parts = word.split('!')
-                        prefix = parts[0]
-                        command = parts[1]
-                        # Lida com pontuação potencial após comando?
-                        # Por enquanto assume separação limpa ou sufixo simples
-                    
-                    val = "N/A"
-                    if command == 'header':
-                        vars=getVars('content_index')
-                        if vars < len(categories):
-                            val=categories[vars]
-                        else:
-                            val="Error"
-                    elif command=="tv":
-                        if TV:
-                            TV.draw(self.x_percent,self.y_percent,)
-                        val = "" # Don't print anything for tv command
-                    elif command.startswith("SPRITE_"):
-                        # Renderização genérica de sprite: SPRITE_<sprite_key>
-                        import graphics
-                        sprite_key = command[7:]  # Remove prefixo "SPRITE_"
-                        # Obtém o sprite
-                        sprite_data = graphics.SPRITE_LOADER.get_sprite(sprite_key)
-                        if sprite_data:
-                            sprite = sprite_data["sprite"]
-                            # Escala sprite para caber na altura do botão, aumenta tamanho se hovering
-                            hover_scale = 1.2 if self.hovering else 1.0
-                            scale_factor = (self.rect.height / sprite.get_height()) * hover_scale
-                            scaled_width = int(sprite.get_width() * scale_factor)
-                            scaled_height = int(sprite.get_height() * scale_factor)
-                            scaled_sprite = pygame.transform.scale(sprite, (scaled_width, scaled_height))
-                            # Centraliza o sprite no retângulo do botão
-                            sprite_rect = scaled_sprite.get_rect(center=self.rect.center)
-                            screen.blit(scaled_sprite, sprite_rect)
-                        val = ""  # Não imprime texto
-                    elif command=="music_display":
-                        if GAME_CLOCK.player.metadata.get('art'):
-                            try:
-                                # Tenta carregar com pygame primeiro
-                                img = pygame.image.load(io.BytesIO(GAME_CLOCK.player.metadata.get('art', b"")))
-                            except Exception as e:
-                                # Fallback: usa PIL/Pillow (melhor suporte no Raspberry Pi)
-                                try:
-                                    from PIL import Image
-                                    pil_img = Image.open(io.BytesIO(GAME_CLOCK.player.metadata.get('art', b"")))
-                                    # Converte PIL para pygame surface
-                                    mode = pil_img.mode
-                                    size = pil_img.size
-                                    data = pil_img.tobytes()
-                                    
-                                    img = pygame.image.fromstring(data, size, mode)
-                                except Exception as e2:
-                                    print(f"Erro ao decodificar imagem do álbum (pygame): {e}")
-                                    print(f"Erro ao decodificar imagem do álbum (PIL): {e2}")
-                                    img = None
-                            
-                            if img:
-                                # Escala a imagem
-                                img_size = self.rect.height
-                                scaled_img = pygame.transform.scale(img, (img_size, img_size))
-                                
-                                # Aplica transparência
-                                scaled_img.set_alpha(128)
-                                
-                                # Desenha na tela
-                                rect = scaled_img.get_rect(center=self.rect.center)
-                                screen.blit(scaled_img, rect)
-                        val = "" 
-                    elif command=="music_progress":
-                        progress = glock.player.get_progress()
-                        # Atualiza a largura percentual
-                        self.width_percent = self.parent.width_percent * (progress / 100.0) if self.parent else (progress / 100.0)
-                        # Recalcula o rect com a nova largura
-                        x_px = PROPSYS.percent_to_px_x(self.x_percent)
-                        y_px = PROPSYS.percent_to_px_y(self.y_percent)
-                        width_px = PROPSYS.percent_to_px_x(self.width_percent)
-                        height_px = PROPSYS.percent_to_px_y(self.height_percent)
-                        self.rect = pygame.Rect(x_px, y_px, width_px, height_px)
-                        val = ""
-                    elif command=="map_render":
-                        if MAP_SYSTEM:
-                            MAP_SYSTEM.set_content_area(self.rect)
-                            # Get location from game clock if available, otherwise default
-                            lat = 42.355
-                            lon = -71.065
-                            if GAME_CLOCK and 'map_lat' in GAME_CLOCK.info:
-                                 lat = GAME_CLOCK.info['map_lat']
-                                 lon = GAME_CLOCK.info['map_lon']
-                            map_surf, source = MAP_SYSTEM.get_static_map(lat, lon)
-                            if map_surf:
-                                screen.blit(map_surf, self.rect)
-                        val = "" # Não imprime nada para comando de mapa
-                    elif command.startswith("toggle_"):
-                        # Suporte para variáveis de toggle: toggle_<setting_name>
-                        import config
-                        setting_name = command[7:]  # Remove prefixo "toggle_"
-                        val = config.get_toggle_display(setting_name)
-                    elif command == "chat_input":
-                        # Exibe o texto digitado pelo usuário com cursor piscante
-                        global chat_cursor_timer, chat_cursor_visible
-                        current_time = pygame.time.get_ticks()
-                        
-                        # Atualiza cursor a cada 500ms (pisca a cada meio segundo)
-                        if current_time - chat_cursor_timer >= 500:
-                            chat_cursor_timer = current_time
-                            chat_cursor_visible = not chat_cursor_visible
-                        
-                        # Mostra cursor "I" apenas se campo estiver ativo
-                        if chat_input_active and chat_cursor_visible:
-                            val = chat_input + " I"  # Cursor "I" com espaço
-                        else:
-                            val = chat_input
-                    elif command == "teevee_response":
-                        # Exibe a resposta do TeeVee ou mensagem de espera
-                        if waiting_for_response:
-                            val = "Pensando..."
-                            
-                        else:
-                            val = chat_response if chat_response else ""
-                    elif command == "page_indicator":
-                        # Exibe indicador de página (ex: <1/3>)
-                        if response_pages and len(response_pages) > 1:
-                            val = f"<{current_page + 1}/{len(response_pages)}>"
-                        else:
-                            val = ""
-                    elif GAME_CLOCK and (command in GAME_CLOCK.vals):
-                        val=GAME_CLOCK.vals[command]
-                    elif GAME_CLOCK and (command in GAME_CLOCK.info):
-                        val=str(GAME_CLOCK.info[command])
-                    elif GAME_CLOCK and (command in GAME_CLOCK.player.metadata):
-                        val=str(GAME_CLOCK.player.metadata[command])
-                    if val != "":
-                         new_words.append(prefix + str(val) + suffix)
-                else:
-                    new_words.append(word)
-            
-            if any(w != "" for w in new_words):
-                txt = " ".join(new_words)
-            else:
-                txt = "" # Se todas as substituições resultaram em strings vazias (como map_render), mantém vazio
-            self.update_font(newtext=txt)
-            
-        """Desenha o botão na superfície"""
+        tokens = []
+        sources = set()
+        for word in self.text.split(' '):
+            if '!' not in word:
+                tokens.append((word, None))
+                continue
+            # Lida com casos como "Rain: !weather_rain %" onde ! está dentro
+            # Divide por ! e substitui a parte depois
+            parts = word.split('!')
+            command = parts[1]
+            if command in DRAW_COMMANDS or command.startswith("SPRITE_"):
+                # Desenhados em paint(), não imprimem texto
+                self._draw_commands.append(command)
+                continue
+            resolver, command_sources = self.bind_command(command)
+            tokens.append((parts[0], resolver))
+            sources.update(command_sources)
+        self._tokens = tokens
+        self.sources = tuple(sorted(sources))
+
+    def bind_command(self, command):
+        """Retorna (resolvedor sem argumentos, fontes de dados) de um comando"""
+        if command == 'header':
+            return self._resolve_header, ("panel",)
+        if command == "music_progress":
+            return self._resolve_music_progress, ("frame",)
+        if command.startswith("toggle_"):
+            # Suporte para variáveis de toggle: toggle_<setting_name>
+            import config
+            setting_name = command[7:]  # Remove prefixo "toggle_"
+            return lambda: config.get_toggle_display(setting_name), ("toggles",)
+        if command == "quality":
+            return lambda: GOVERNOR.label() if GOVERNOR else "N/A", ("quality",)
+        if command == "chat_input":
+            return _resolve_chat_input, ("chat",)
+        if command == "teevee_response":
+            return _resolve_teevee_response, ("chat",)
+        if command == "page_indicator":
+            return _resolve_page_indicator, ("chat",)
+        # Valores do relógio, das informações do sistema ou da música
+        return lambda: _resolve_clock_value(command), ("clock", "info", "metadata")
+
+    def _resolve_header(self):
+        vars=getVars('content_index')
+        if vars < len(categories):
+            return categories[vars]
+        return "Error"
+
+    def _resolve_music_progress(self):
+        progress = glock.player.get_progress()
+        # Atualiza a largura percentual
+        self.width_percent = self.parent.width_percent * (progress / 100.0) if self.parent else (progress / 100.0)
+        # Recalcula o rect com a nova largura
+        x_px = PROPSYS.percent_to_px_x(self.x_percent)
+        y_px = PROPSYS.percent_to_px_y(self.y_percent)
+        width_px = PROPSYS.percent_to_px_x(self.width_percent)
+        height_px = PROPSYS.percent_to_px_y(self.height_percent)
+        self.rect = pygame.Rect(x_px, y_px, width_px, height_px)
+        return ""
+
+    def resolve_text(self):
+        """Substitui as variáveis (!comando) do texto pelos valores atuais"""
+        if self._parsed_text != self.text:
+            self.compile_text()
+        if self._tokens is None:
+            return self.text
+        new_words = []
+        for prefix, resolver in self._tokens:
+            if resolver is None:
+                new_words.append(prefix)
+                continue
+            val = resolver()
+            if val != "":
+                new_words.append(prefix + str(val))
+
+        if any(w != "" for w in new_words):
+            return " ".join(new_words)
+        return "" # Se todas as substituições resultaram em strings vazias (como map_render), mantém vazio
+
+    def get_draw_commands(self):
+        """Comandos do texto que desenham algo (tv, sprites, capa, mapa)"""
+        if self._parsed_text != self.text:
+            self.compile_text()
+        return self._draw_commands
+
+    def resolve(self):
+        """Resolve as variáveis só quando uma fonte de dados do texto mudou"""
+        if self._parsed_text != self.text:
+            self.compile_text()
+        if self._tokens is not None:
+            versions = tuple(SOURCE_VERSIONS[source] for source in self.sources)
+            if versions != self._source_versions:
+                self._source_versions = versions
+                txt = self.resolve_text()
+                if txt != self.rendered_text:
+                    self.update_font(newtext=txt)
+        if MAP_SYSTEM and "map_render" in self._draw_commands:
+            MAP_SYSTEM.set_content_area(self.rect)
+        self.bounds = self.get_bounds()
+
+    def get_bounds(self):
+        """Área da tela afetada pelo desenho do elemento"""
+        bounds = self.rect.union(self.text_rect)
+        for command in self.get_draw_commands():
+            if command == "tv":
+                if TV:
+                    bounds.union_ip(TV.get_bounds(self.x_percent, self.y_percent))
+            elif command.startswith("SPRITE_") or command == "music_toggle":
+                sprite_rect = self._get_sprite_rect(self._sprite_key(command))
+                if sprite_rect:
+                    bounds.union_ip(sprite_rect)
+            elif command == "music_display":
+                art_rect = pygame.Rect(0, 0, self.rect.height, self.rect.height)
+                art_rect.center = self.rect.center
+                bounds.union_ip(art_rect)
+        return bounds
+
+    def get_state(self):
+        """Tudo que muda a aparência do elemento; usado pelo DirtyRenderer"""
+        # Mapa e capa entram como objetos, não id(): o estado guardado mantém a
+        # referência, então um endereço reaproveitado não passa por "sem mudança"
+        extra = []
+        for command in self.get_draw_commands():
+            if command == "tv":
+                extra.append(TV.face_state() if TV else None)
+            elif command == "map_render":
+                map_surf = MAP_SYSTEM.map_manager.current_map_surface if MAP_SYSTEM else None
+                extra.append(map_surf)
+            elif command == "music_display":
+                extra.append(GAME_CLOCK.player.metadata.get('art'))
+            elif command == "music_toggle":
+                extra.append(GAME_CLOCK.player.is_playing)
+        return (self.text, self.rendered_text, self.hovering, tuple(self.rect),
+                tuple(self.bounds), tuple(extra))
+
+    @staticmethod
+    def _sprite_key(command):
+        """Sprite desenhado por um comando SPRITE_<chave> ou music_toggle"""
+        if command == "music_toggle":
+            # Ícone do botão play/pause segue o estado do player
+            return "pause" if GAME_CLOCK.player.is_playing else "play"
+        return command[7:]  # Remove prefixo "SPRITE_"
+
+    def _get_sprite_rect(self, sprite_key):
+        import graphics
+        sprite_data = graphics.SPRITE_LOADER.get_sprite(sprite_key)
+        if not sprite_data:
+            return None
+        sprite = sprite_data["sprite"]
+        # Escala sprite para caber na altura do botão, aumenta tamanho se hovering
+        hover_scale = 1.2 if self.hovering else 1.0
+        scale_factor = (self.rect.height / sprite.get_height()) * hover_scale
+        scaled_width = int(sprite.get_width() * scale_factor)
+        scaled_height = int(sprite.get_height() * scale_factor)
+        sprite_rect = pygame.Rect(0, 0, scaled_width, scaled_height)
+        # Centraliza o sprite no retângulo do botão
+        sprite_rect.center = self.rect.center
+        return sprite_rect
+
+    def _get_album_art(self, art):
+        """Capa do álbum decodificada, escalada e convertida uma vez por faixa"""
+        # Guarda a própria capa e compara com "is": um id() pode ser
+        # reaproveitado por outro objeto depois que a capa antiga é coletada
+        cached = self._album_art
+        if cached is not None and cached[0] is art and cached[1] == self.rect.height:
+            return cached[2]
+        try:
+            # Tenta carregar com pygame primeiro
+            img = pygame.image.load(io.BytesIO(art))
+        except Exception as e:
+            # Fallback: usa PIL/Pillow (melhor suporte no Raspberry Pi)
+            try:
+                from PIL import Image
+                pil_img = Image.open(io.BytesIO(art))
+                # Converte PIL para pygame surface
+                mode = pil_img.mode
+                size = pil_img.size
+                data = pil_img.tobytes()
+
+                img = pygame.image.fromstring(data, size, mode)
+            except Exception as e2:
+                print(f"Erro ao decodificar imagem do álbum (pygame): {e}")
+                print(f"Erro ao decodificar imagem do álbum (PIL): {e2}")
+                img = None
+
+        if img:
+            # Escala a imagem
+            img_size = self.rect.height
+            img = pygame.transform.scale(img, (img_size, img_size))
+
+            # Aplica transparência
+            img.set_alpha(128)
+            img = assets.prepare(img)
+        self._album_art = (art, self.rect.height, img)
+        return img
+
+    def _draw_command(self, command, screen):
+        if command=="tv":
+            if TV:
+                TV.draw(screen, self.x_percent, self.y_percent)
+        elif command.startswith("SPRITE_") or command == "music_toggle":
+            # Renderização genérica de sprite: SPRITE_<sprite_key>
+            import graphics
+            sprite_key = self._sprite_key(command)
+            sprite_rect = self._get_sprite_rect(sprite_key)
+            if sprite_rect:
+                # Variante escalada vem do cache do spriteLoader
+                assets.blit(screen, graphics.SPRITE_LOADER.get_scaled(sprite_key, sprite_rect.size), sprite_rect)
+        elif command=="music_display":
+            art = GAME_CLOCK.player.metadata.get('art')
+            if art:
+                img = self._get_album_art(art)
+                if img:
+                    # Desenha na tela
+                    rect = img.get_rect(center=self.rect.center)
+                    assets.blit(screen, img, rect)
+        elif command=="map_render":
+            if MAP_SYSTEM:
+                # Get location from game clock if available, otherwise default
+                lat = 42.355
+                lon = -71.065
+                if GAME_CLOCK and 'map_lat' in GAME_CLOCK.info:
+                     lat = GAME_CLOCK.info['map_lat']
+                     lon = GAME_CLOCK.info['map_lon']
+                map_surf, source = MAP_SYSTEM.get_static_map(lat, lon)
+                if map_surf:
+                    assets.blit(screen, map_surf, self.rect)
+
+    def paint(self, screen):
+        """Desenha o botão na superfície; retorna False se os filhos não devem ser desenhados"""
+        for command in self.get_draw_commands():
+            self._draw_command(command, screen)
+
         text_surface= self.text_surface
         if self.background:
-            if self.inverted_colors:
-                # Cria superfície temporária para efeitos
-                temp_surface = pygame.Surface((self.rect.width, self.rect.height), pygame.SRCALPHA)
-                
-                # Desenha retângulo base com cantos arredondados
-                temp_rect = pygame.Rect(0, 0, self.rect.width, self.rect.height)
-                pygame.draw.rect(temp_surface, self.color, temp_rect, border_radius=30)
-                
-                # Aplica gradiente usando função reutilizável
-                apply_gradient_effect(temp_surface, self.rect.width, self.rect.height, 
-                                    self.color, intensity=0.5, opacity=150, border_radius=30)
-                
-                if self.rect.width < 20:
-                    return
-                # Aplica brilho usando função reutilizável com cor adaptativa
-                apply_shine_effect(temp_surface, self.rect.width, self.rect.height, 
-                                 intensity=40, shine_percent=0.3, border_radius=30, offset_y=5, base_color=self.color)
-                
-                # Adiciona borda interna sutil para definição
-                inner_rect = pygame.Rect(2, 2, self.rect.width - 4, self.rect.height - 4)
-                pygame.draw.rect(temp_surface, (*self.color[:3], 100), inner_rect, 1, border_radius=28)
-                
-                # Desenha na tela
-                screen.blit(temp_surface, self.rect.topleft)
-            else:
-                # Cria superfície temporária para efeitos
-                temp_surface = pygame.Surface((self.rect.width, self.rect.height), pygame.SRCALPHA)
-                
-                # Desenha borda externa com brilho
-                temp_rect = pygame.Rect(0, 0, self.rect.width, self.rect.height)
-                
-                # Borda principal
-                pygame.draw.rect(temp_surface, self.color, temp_rect, self.outline_size, border_radius=30)
-                
-                # Aplica brilho usando função reutilizável com cor adaptativa
-                if self.rect.width > self.outline_size * 2:
-                    # Cria superfície temporária para o brilho interno
-                    shine_width = self.rect.width - self.outline_size * 2
-                    shine_height_total = self.rect.height - self.outline_size * 2
-                    inner_shine_surface = pygame.Surface((shine_width, shine_height_total), pygame.SRCALPHA)
-                    
-                    apply_shine_effect(inner_shine_surface, shine_width, shine_height_total,
-                                     intensity=60, shine_percent=0.15, border_radius=25, offset_y=0, base_color=self.color)
-                    
-                    temp_surface.blit(inner_shine_surface, (self.outline_size, self.outline_size))
-                
-                # Adiciona destaque na borda superior (highlight)
-                highlight_thickness = max(1, self.outline_size // 2)
-                highlight_rect = pygame.Rect(self.outline_size, self.outline_size,
-                                            self.rect.width - self.outline_size * 2,
-                                            self.rect.height - self.outline_size * 2)
-                
-                # Cor de destaque (mais clara)
-                highlight_color = tuple(min(255, c + 40) for c in self.color[:3])
-                pygame.draw.rect(temp_surface, (*highlight_color, 80), highlight_rect, 
-                               highlight_thickness, border_radius=25)
-                
-                # Desenha na tela
-                screen.blit(temp_surface, self.rect.topleft)
-        screen.blit(text_surface, self.text_rect)
-        for subelement_key in self.subelements:
-            subelement = self.subelements[subelement_key]
-            subelement.draw(screen)
-    
-    def update_font(self, scale=1,newtext=None):
+            # Fundo montado uma vez por (tamanho, cor, variante) e reaproveitado
+            if self.inverted_colors and self.rect.width < 20:
+                return False
+            background = element_background(self.rect.width, self.rect.height, self.color,
+                                            self.inverted_colors, self.outline_size)
+            assets.blit(screen, background, self.rect.topleft)
+        assets.blit(screen, text_surface, self.text_rect)
+        return True
+    
+    def update_font(self, scale=None,newtext=None):
         # Atualiza fonte
-        font_size = int(PROPSYS.percent_to_px_y(self.font_size_percent*scale))
-        self.font = pygame.font.Font(font, font_size*2)
-        text=self.text if newtext is None else newtext
+        if scale is not None:
+            self.font_scale = scale
+        self.font_size = font_px(self.font_size_percent*self.font_scale)
+        self.font = FONTS.get(font, self.font_size)
+        text=self.rendered_text if newtext is None else str(newtext)
+        self.rendered_text = text
         color=self.color if not self.inverted_colors else DEFS['bg'] 
-        self.text_surface = self._render_text_wrapped(str(text), color)
+        self.text_surface = self._render_text_wrapped(text, color)
         self.text_rect = self.text_surface.get_rect(center=self.rect.center)
         if self.text_align == 'left':
             self.text_rect.left = self.rect.left *1.1
         elif self.text_align == 'right':
             self.text_rect.right = self.rect.right * 0.9
-    def check_hover(self, pos):
-        """Verifica se o mouse está sobre o botão"""
-        if not self.clickable:
-            return False
-        if self.rect.collidepoint(pos):
-            self.hovering=True
-            self.update_font(scale=1.2)
-            return True
-        else:
-            if self.hovering:
-                self.update_font()
-                self.hovering = False
-            return False
+    def set_hover(self, hovering):
+        """Aplica o estado de hover (fonte ampliada) se ele mudou"""
+        if hovering == self.hovering:
+            return
+        self.hovering = hovering
+        self.update_font(scale=HOVER_FONT_SCALE if hovering else 1)
     
     def is_clicked(self, pos, event):
         """Verifica se o botão foi clicado"""
@@ -720,17 +995,6 @@ class UElement:
         """Retorna o tamanho atual em porcentagem"""    
         return (self.width_percent, self.height_percent)
 
-def searchElement(element,key):
-    if element.subelements.get(key):
-        return element.subelements.get(key)
-    else:
-        for subelement_key in element.subelements:
-            subelement = element.subelements[subelement_key]
-            result = searchElement(subelement, key)
-            if result:
-                return result
-    return None
-
 def generate_calendar_subelements():
     now = datetime.datetime.now()
     year = now.year
@@ -778,110 +1042,494 @@ def generate_calendar_subelements():
             
     return calendar_subs
 
-def build_ui():
-    vars = getVars('content_index')
-    for i, (menu, vals) in enumerate(DICT['contentvals'].items()): 
-        frame={
-            'visible': i==vars,
-            'background':True,
-            'subelements':{},
-        }
+# Painéis de conteúdo construídos, do menos ao mais recente; os que não
+# estão visíveis são descartados além de MAX_PANELS e reconstruídos de
+# dictionary.json quando o usuário voltar a eles
+PANEL_LRU = OrderedDict()
+MAX_PANELS = 3
+
+def panel_frame(menu, vals):
+    """Definição do painel de conteúdo menu (DICT['contentvals'][menu])"""
+    frame={
+        'visible': True,
+        'background':True,
+        'subelements':{},
+    }
+    
+    # Cópia profunda de vals para evitar modificar DICT original
+    vals_copy = copy.deepcopy(vals)
+    
+    # Injeta dias do calendário se for painel de clima
+    if 'format' in vals_copy and vals_copy['format'] == 'weather':
+        # Precisamos encontrar CALENDAR_FRAME na estrutura e populá-lo
+        # A estrutura está em DICT['format']['weather']
+        # Mas aqui estamos iterando sobre contentvals.
+        # O 'vals' aqui é apenas {'format': 'weather'}
         
-        # Cópia profunda de vals para evitar modificar DICT original
-        vals_copy = copy.deepcopy(vals)
+        # Precisamos modificar o formato carregado de DICT['format']['weather']
+        # Mas não podemos modificar DICT diretamente ou persistirá/duplicará em re-renders se fosséssemos re-renderizar
+        # (o painel é reconstruído do zero sempre que sai do PANEL_LRU)
         
-        # Injeta dias do calendário se for painel de clima
-        if 'format' in vals_copy and vals_copy['format'] == 'weather':
-            # Precisamos encontrar CALENDAR_FRAME na estrutura e populá-lo
-            # A estrutura está em DICT['format']['weather']
-            # Mas aqui estamos iterando sobre contentvals.
-            # O 'vals' aqui é apenas {'format': 'weather'}
-            
-            # Precisamos modificar o formato carregado de DICT['format']['weather']
-            # Mas não podemos modificar DICT diretamente ou persistirá/duplicará em re-renders se fosséssemos re-renderizar
-            # Porém, build_ui é chamado uma vez.
-            
-            # Vamos obter o formato de clima
-            weather_format = copy.deepcopy(DICT['format']['weather'])
-            
-            # Encontra CALENDAR_FRAME
-            if 'subelements' in weather_format:
-                if 'WEATHER_DISPLAY' in weather_format['subelements']:
-                    if 'subelements' in weather_format['subelements']['WEATHER_DISPLAY']:
-                        if 'CALENDAR_FRAME' in weather_format['subelements']['WEATHER_DISPLAY']['subelements']:
-                            calendar_frame = weather_format['subelements']['WEATHER_DISPLAY']['subelements']['CALENDAR_FRAME']
-                            calendar_frame['subelements'] = generate_calendar_subelements()
-            
-            # Agora usa este formato modificado para este item de menu
-            # Precisamos construir manualmente o conteúdo do frame porque o loop abaixo espera pares chave-valor
-            # que mapeiam para subelementos.
-            
-            # Na verdade, o loop abaixo itera sobre chaves em 'vals'.
-            # Para WEATHER, vals é {"format": "weather"}
-            # O loop vê key="format", val="weather"
-            # Verifica se 'format' em name (sim) e DICT['format'][val] existe (sim)
-            # Então define format=DICT['format'][val]
-            
-            # Então precisamos interceptar este caso específico no loop
-            pass
+        # Vamos obter o formato de clima
+        weather_format = copy.deepcopy(DICT['format']['weather'])
+        
+        # Encontra CALENDAR_FRAME
+        if 'subelements' in weather_format:
+            if 'WEATHER_DISPLAY' in weather_format['subelements']:
+                if 'subelements' in weather_format['subelements']['WEATHER_DISPLAY']:
+                    if 'CALENDAR_FRAME' in weather_format['subelements']['WEATHER_DISPLAY']['subelements']:
+                        calendar_frame = weather_format['subelements']['WEATHER_DISPLAY']['subelements']['CALENDAR_FRAME']
+                        calendar_frame['subelements'] = generate_calendar_subelements()
+        
+        # Agora usa este formato modificado para este item de menu
+        # Precisamos construir manualmente o conteúdo do frame porque o loop abaixo espera pares chave-valor
+        # que mapeiam para subelementos.
+        
+        # Na verdade, o loop abaixo itera sobre chaves em 'vals'.
+        # Para WEATHER, vals é {"format": "weather"}
+        # O loop vê key="format", val="weather"
+        # Verifica se 'format' em name (sim) e DICT['format'][val] existe (sim)
+        # Então define format=DICT['format'][val]
+        
+        # Então precisamos interceptar este caso específico no loop
+        pass
 
-        enums=list(enumerate(vals.items()))
-        for j, (name, val) in enums:
-            format={}
-            
-            if 'format' in name and DICT['format'][val]:
-                if val == 'weather':
-                 # Tratamento especial para clima para injetar calendário
-                     format = copy.deepcopy(DICT['format'][val])
-                     # Injeta calendário
-                     try:
-                        format['subelements']['WEATHER_DISPLAY']['subelements']['CALENDAR_FRAME']['subelements'] = generate_calendar_subelements()
-                     except KeyError:
-                         print("Could not inject calendar: structure mismatch")
-                else:
-                    format=DICT['format'][val]
+    enums=list(enumerate(vals.items()))
+    for j, (name, val) in enums:
+        format={}
+        
+        if 'format' in name and DICT['format'][val]:
+            if val == 'weather':
+             # Tratamento especial para clima para injetar calendário
+                 format = copy.deepcopy(DICT['format'][val])
+                 # Injeta calendário
+                 try:
+                    format['subelements']['WEATHER_DISPLAY']['subelements']['CALENDAR_FRAME']['subelements'] = generate_calendar_subelements()
+                 except KeyError:
+                     print("Could not inject calendar: structure mismatch")
             else:
-                format = {
-                    'text': name + " : ",
-                    'y_percent': j * 0.33,
-                    'height_percent': 0.33,
-                    'font_size_percent': 0.05,
-                    'text_align': 'left',
-                    'color': primary_color,
-                    'subelements': {
-                        name + "value": {
-                            'x_percent': 0.665,
-                            'width_percent': 0.33,
-                            'text': val,
-                            'color': secondary_color,
-                            'inverted_colors': True,
-                            'font_size_percent': 0.05,
-                        }
+                format=DICT['format'][val]
+        else:
+            format = {
+                'text': name + " : ",
+                'y_percent': j * 0.33,
+                'height_percent': 0.33,
+                'font_size_percent': 0.05,
+                'text_align': 'left',
+                'color': primary_color,
+                'subelements': {
+                    name + "value": {
+                        'x_percent': 0.665,
+                        'width_percent': 0.33,
+                        'text': val,
+                        'color': secondary_color,
+                        'inverted_colors': True,
+                        'font_size_percent': 0.05,
                     }
                 }
-            frame['subelements'][name] = format 
-        user_interface['content_panel'].add_subelement(menu, frame)
-
-def get_all_clickable(element):
-    buttons = []
-    if element.clickable:
-        buttons.append(element)
-    for subelement_key in element.subelements:
-        subelement = element.subelements[subelement_key]
-        if subelement.visible:
-            buttons.extend(get_all_clickable(subelement))
-    return buttons
+            }
+        frame['subelements'][name] = format 
+    return frame
+
+def build_panel(menu):
+    """Constrói o painel menu dentro de content_panel"""
+    user_interface['content_panel'].add_subelement(menu, panel_frame(menu, DICT['contentvals'][menu]))
+    return user_interface['content_panel'].subelements[menu]
+
+def show_content(menu):
+    """
+    Mostra o painel menu e esconde os demais, construindo-o na primeira
+    visita e descartando os painéis escondidos mais antigos
+
+    Returns:
+        O elemento do painel
+    """
+    content_panel = user_interface['content_panel']
+    element = content_panel.subelements.get(menu)
+    changed = element is None
+    if changed:
+        element = build_panel(menu)
+    for sibling in content_panel.subelements.values():
+        sibling.visible = False
+    element.visible = True
+
+    PANEL_LRU[menu] = True
+    PANEL_LRU.move_to_end(menu)
+    while len(PANEL_LRU) > MAX_PANELS:
+        old, _ = PANEL_LRU.popitem(last=False)
+        content_panel.subelements.pop(old, None)
+        changed = True
+
+    if changed:
+        LAYOUT.build(user_interface)
+    refresh_hit_grid()
+    return element
+
+def build_ui():
+    """Constrói só o painel atual; os outros são construídos em show_content"""
+    PANEL_LRU.clear()
+    vars = getVars('content_index')
+    menu = categories[vars] if vars < len(categories) else categories[0]
+    build_panel(menu)
+    PANEL_LRU[menu] = True
+
+class LayoutTree:
+    """
+    Árvore de UI compilada em listas planas, em ordem de desenho (pré-ordem)
+
+    Cada nó guarda o índice do pai, o fim da sua subárvore (os descendentes
+    ficam em índices contíguos), o retângulo absoluto e o bit de visibilidade
+    efetiva. Percorrer, desenhar e testar cliques viram varreduras lineares, e
+    buscar um elemento pela chave (find) vira uma consulta no mapa nome -> índices.
+    """
+    def __init__(self):
+        self.nodes = []
+        self.keys = []       # Chave do nó no dict do pai
+        self.parents = []    # Índice do pai (-1 para os painéis de user_interface)
+        self.ends = []       # Índice logo após o último descendente
+        self.rects = []
+        self.visible = []
+        self.index = {}      # chave -> índices, em ordem de desenho
+        self.positions = {}  # elemento -> índice
+        self.generation = 0  # Incrementa a cada build
+
+    def build(self, roots):
+        """Compila a árvore a partir de user_interface"""
+        for table in (self.nodes, self.keys, self.parents, self.ends, self.rects, self.visible):
+            table.clear()
+        self.index.clear()
+        self.positions.clear()
+        self.generation += 1
+
+        stack = [(key, element, -1) for key, element in reversed(list(roots.items()))]
+        while stack:
+            key, element, parent = stack.pop()
+            i = len(self.nodes)
+            self.nodes.append(element)
+            self.keys.append(key)
+            self.parents.append(parent)
+            self.ends.append(i + 1)
+            self.rects.append(element.rect)
+            self.visible.append(False)
+            self.index.setdefault(key, []).append(i)
+            self.positions[element] = i
+            for sub_key, subelement in reversed(list(element.subelements.items())):
+                stack.append((sub_key, subelement, i))
+
+        # Em pré-ordem o fim da subárvore de um pai é o maior fim entre os filhos
+        for i in range(len(self.nodes) - 1, -1, -1):
+            parent = self.parents[i]
+            if parent >= 0 and self.ends[i] > self.ends[parent]:
+                self.ends[parent] = self.ends[i]
+        self.scan()
+
+    def scan(self):
+        """Atualiza visibilidade efetiva e retângulos (o pai vem sempre antes do filho)"""
+        visible = self.visible
+        for i, element in enumerate(self.nodes):
+            parent = self.parents[i]
+            visible[i] = element.visible and (parent < 0 or visible[parent])
+            self.rects[i] = element.rect
+        return visible
+
+    def find(self, key, within=None):
+        """Primeiro nó com a chave key (dentro da subárvore de within, se informado)"""
+        if within is not None:
+            direct = within.subelements.get(key)
+            if direct:
+                return direct
+        indices = self.index.get(key, ())
+        if within is None:
+            return self.nodes[indices[0]] if indices else None
+        start = self.positions[within]
+        end = self.ends[start]
+        for i in indices:
+            if start < i < end:
+                return self.nodes[i]
+        return None
+
+    def paint(self, screen, clip=None, include=None):
+        """
+        Desenha em ordem, pulando subárvores invisíveis e as de quem pediu
+        para não desenhar os filhos (paint retornou False)
+
+        Args:
+            screen: Superfície de destino
+            clip: Só desenha os elementos cujos bounds tocam clip
+            include: Conjunto de índices a desenhar; os outros nós são
+                atravessados sem desenhar (seus filhos ainda são visitados)
+        """
+        nodes = self.nodes
+        ends = self.ends
+        i = 0
+        count = len(nodes)
+        while i < count:
+            element = nodes[i]
+            if not element.visible:
+                i = ends[i]
+                continue
+            if include is None or i in include:
+                if clip is None or element.bounds.colliderect(clip):
+                    if not element.paint(screen):
+                        i = ends[i]
+                        continue
+            i += 1
+
+LAYOUT = LayoutTree()
 
 def clickable_elements():
-    buttons=[]
-    
-    for element_key in user_interface:
-        element = user_interface[element_key]
-        buttons.extend(get_all_clickable(element))
-    return buttons
-
-def render_ui(screen):
-    for element_key in user_interface:
-        element = user_interface[element_key]   
-        element.draw(screen)
-    return user_interface
\ No newline at end of file
+    """Elementos clicáveis visíveis, em ordem de desenho"""
+    visible = LAYOUT.scan()
+    return [element for element, shown in zip(LAYOUT.nodes, visible) if shown and element.clickable]
+
+# Evento postado quando o mouse entra ou sai de um elemento clicável
+# (atributos: element, hovering)
+UI_HOVER = pygame.event.custom_type()
+
+class HitGrid:
+    """
+    Índice espacial dos elementos clicáveis visíveis numa grade uniforme
+
+    Cada célula lista, em ordem de desenho, os elementos cujo retângulo a
+    toca. Movimento e clique consultam só a célula do cursor. A grade é
+    reconstruída apenas quando a visibilidade ou o layout mudam
+    (refresh_hit_grid), e as trocas de hover viram eventos UI_HOVER.
+    """
+    def __init__(self, cell_size=64):
+        self.cell_size = cell_size
+        self.cells = {}
+        self.hovered = []  # Elementos sob o cursor desde o último hover()
+        self.pointer = None  # Última posição passada a hover() (coordenadas de desenho)
+
+    def rebuild(self, elements):
+        self.cells.clear()
+        size = self.cell_size
+        for element in elements:
+            rect = element.rect
+            if rect.width <= 0 or rect.height <= 0:
+                continue
+            for cx in range(rect.left // size, (rect.right - 1) // size + 1):
+                for cy in range(rect.top // size, (rect.bottom - 1) // size + 1):
+                    self.cells.setdefault((cx, cy), []).append(element)
+        # Elementos que saíram do índice (painel escondido) perdem o hover
+        present = set(elements)
+        for element in self.hovered:
+            if element not in present:
+                post_hover(element, False)
+        self.hovered = [element for element in self.hovered if element in present]
+
+    def query(self, pos):
+        """Elementos clicáveis sob pos, em ordem de desenho"""
+        cell = self.cells.get((int(pos[0]) // self.cell_size, int(pos[1]) // self.cell_size), ())
+        return [element for element in cell if element.rect.collidepoint(pos)]
+
+    def hover(self, pos):
+        """Posta UI_HOVER para os elementos em que o mouse entrou ou de que saiu"""
+        self.pointer = pos
+        current = self.query(pos)
+        for element in self.hovered:
+            if element not in current:
+                post_hover(element, False)
+        for element in current:
+            if element not in self.hovered:
+                post_hover(element, True)
+        self.hovered = current
+
+def post_hover(element, hovering):
+    pygame.event.post(pygame.event.Event(UI_HOVER, element=element, hovering=hovering))
+
+HIT_GRID = HitGrid()
+
+def refresh_hit_grid():
+    """Reconstrói o índice de cliques (após trocar painel, visibilidade ou layout)"""
+    HIT_GRID.rebuild(clickable_elements())
+    # Um elemento novo pode ter aparecido sob o cursor parado. A posição vem
+    # do último hover (pygame.mouse.get_pos está nas coordenadas da janela,
+    # não nas de desenho quando há resolução interna)
+    if HIT_GRID.pointer is not None:
+        HIT_GRID.hover(HIT_GRID.pointer)
+
+def walk_elements():
+    """Percorre a árvore em ordem de desenho: (elemento, visível de fato)"""
+    return zip(LAYOUT.nodes, LAYOUT.scan())
+
+class PanelLayers:
+    """
+    Composição em camadas da UI visível
+
+    A camada estática (fundo, molduras, rótulos fixos, ícones) é desenhada
+    uma vez numa textura do tamanho da tela. Por cima, a cada quadro, só os
+    elementos dinâmicos: texto com !variáveis, clicáveis (hover), tv, capa,
+    mapa e tudo que vem depois deles na ordem de desenho e os sobrepõe. A
+    textura é refeita quando o layout, a visibilidade, o tamanho ou o tema
+    e os toggles (fonte "toggles", que acompanha DEFS) mudam, e também quando
+    um elemento dinâmico cresce além da área usada para classificar (um texto
+    mais longo pode passar a cobrir um elemento que estava na camada estática).
+    """
+    def __init__(self):
+        self.key = None
+        self.surface = None
+        self.dynamic = []  # Índices do LAYOUT desenhados a cada quadro
+        self.dynamic_set = set()
+        self.areas = {}    # Elemento dinâmico -> maior área já vista
+
+    @staticmethod
+    def is_dynamic(element):
+        if element.sources or element.clickable:
+            return True
+        return any(not command.startswith("SPRITE_") for command in element.get_draw_commands())
+
+    def classify(self, visible):
+        """Índices dinâmicos: os próprios, seus descendentes e quem os sobrepõe depois"""
+        nodes = LAYOUT.nodes
+        dynamic = []
+        dynamic_bounds = []
+        end = 0  # Fim da subárvore dinâmica atual
+        for i, element in enumerate(nodes):
+            if not visible[i]:
+                continue
+            area = element.bounds.union(element.rect)
+            previous = self.areas.get(element)
+            if previous is not None:
+                # Só cresce: um texto que encolhe e volta não reclassifica de novo
+                area.union_ip(previous)
+            if i < end or self.is_dynamic(element) or area.collidelist(dynamic_bounds) >= 0:
+                dynamic.append(i)
+                dynamic_bounds.append(area)
+                self.areas[element] = area
+                end = max(end, LAYOUT.ends[i])
+        return dynamic
+
+    def outgrown(self):
+        """Algum elemento dinâmico saiu da área com que foi classificado"""
+        nodes = LAYOUT.nodes
+        areas = self.areas
+        for i in self.dynamic:
+            bounds = nodes[i].bounds
+            # Retângulo vazio (barra de progresso em 0%) não desenha nada
+            if bounds.width and bounds.height and not areas[nodes[i]].contains(bounds):
+                return True
+        return False
+
+    def update(self, screen, visible):
+        """Refaz a camada estática se algo que ela depende mudou"""
+        key = (screen.get_size(), LAYOUT.generation, tuple(visible), SOURCE_VERSIONS["toggles"])
+        if key == self.key:
+            if not self.outgrown():
+                return False
+        else:
+            self.areas = {}
+        self.key = key
+        self.dynamic = self.classify(visible)
+        if self.surface is None or self.surface.get_size() != screen.get_size():
+            self.surface = assets.prepare(screen.copy(), alpha=False)
+        self.surface.fill(DEFS['bg'])
+        dynamic = set(self.dynamic)
+        LAYOUT.paint(self.surface, include=set(range(len(LAYOUT.nodes))) - dynamic)
+        self.dynamic_set = dynamic
+        return True
+
+    def paint(self, screen, clip=None):
+        """Camada estática (área clip ou tela toda) e os elementos dinâmicos por cima"""
+        if clip is None:
+            assets.blit(screen, self.surface, (0, 0))
+        else:
+            assets.blit(screen, self.surface, clip, clip)
+        LAYOUT.paint(screen, clip, include=self.dynamic_set)
+
+    def invalidate(self):
+        self.key = None
+        self.areas = {}
+
+class DirtyRenderer:
+    """
+    Renderizador retido da árvore de UI
+
+    Guarda o estado de cada UElement (texto resolvido, visibilidade, hover,
+    retângulos e valores vinculados) e redesenha apenas as áreas dos
+    elementos que mudaram. Com um efeito de tela cheia ativo o quadro
+    inteiro é redesenhado. Nos dois casos a área parte da camada estática
+    (PanelLayers) e só os elementos dinâmicos são desenhados por cima.
+    """
+    def __init__(self, full_threshold=0.5):
+        self.states = {}
+        self.needs_full = True
+        # Se o último render viu uma fonte de dados ou um elemento mudar
+        # (o loop só dorme quando o quadro anterior não mudou nada)
+        self.changed = True
+        # Se há elemento visível vinculado à fonte "frame" (progresso da música)
+        self.animating = False
+        self.layers = PanelLayers()
+        # Acima desta fração da tela vale mais redesenhar tudo
+        self.full_threshold = full_threshold
+
+    def invalidate(self):
+        """Força um redesenho completo no próximo quadro (ex: troca de modo de tela)"""
+        self.needs_full = True
+        self.layers.invalidate()
+
+    def render(self, screen, full=False):
+        """
+        Resolve e desenha a UI
+
+        Args:
+            screen: Superfície de destino
+            full: Redesenha o quadro inteiro (efeitos de tela cheia ativos)
+
+        Returns:
+            Lista de retângulos alterados, ou None se o quadro inteiro foi redesenhado
+        """
+        states = {}
+        dirty = []
+        sources_changed = refresh_sources()
+        animating = False
+        for element, visible in walk_elements():
+            if visible:
+                element.resolve()
+                state = element.get_state()
+                animating = animating or "frame" in element.sources
+            else:
+                state = None
+            states[element] = state
+
+            old_state = self.states.get(element)
+            if old_state != state:
+                if old_state is not None:
+                    dirty.append(pygame.Rect(old_state[4]))
+                if state is not None:
+                    dirty.append(element.bounds.copy())
+        self.states = states
+        self.changed = sources_changed or bool(dirty)
+        self.animating = animating
+        self.layers.update(screen, LAYOUT.visible)
+
+        screen_rect = screen.get_rect()
+        rects = merge_rects([rect.clip(screen_rect) for rect in dirty if rect.colliderect(screen_rect)])
+        dirty_area = sum(rect.width * rect.height for rect in rects)
+
+        if full or self.needs_full or dirty_area > screen_rect.width * screen_rect.height * self.full_threshold:
+            self.layers.paint(screen)
+            # Depois de um quadro com efeitos, o próximo precisa ser completo
+            self.needs_full = full
+            return None
+
+        for rect in rects:
+            screen.set_clip(rect)
+            self.layers.paint(screen, rect)
+        screen.set_clip(None)
+        return rects
+
+def merge_rects(rects):
+    """Une retângulos que se sobrepõem até não haver mais sobreposição"""
+    merged = []
+    for rect in rects:
+        rect = rect.copy()
+        i = 0
+        while i < len(merged):
+            if rect.colliderect(merged[i]):
+                rect.union_ip(merged.pop(i))
+                i = 0
+            else:
+                i += 1
+        merged.append(rect)
+    return merged